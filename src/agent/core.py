@@ -6,24 +6,75 @@ from ontology.graph import CapabilityGraph
 from ontology.types import DataType
 from ontology.tools import Tool
 from synthesis.factory import LLMFactory
-from execution.runner import CodeRunner
+from execution.runner import CodeRunner, WarmRunner
 from execution.docker_runner import DockerRunner
+from execution.process_runner import ProcessRunner
 from utils.code_parsing import extract_code_block
+from utils.schema_validation import validate_direct_result
 from utils.tracer import tracer
 from synthesis.test_generator import TestGenerator
 
+# Static synthesis instructions. Kept constant across tasks and retries so that
+# providers with prompt-prefix caching can reuse it.
+SYNTHESIS_SYSTEM_PROMPT = """You are an expert Python developer.
+You write Python functions `transform(input_data) -> output_data` that convert data of one type into another.
+The output must strictly adhere to the target schema.
+If the input is HTML, use BeautifulSoup with the 'lxml' parser, falling back to 'html.parser' if lxml is not installed.
+Parse the input once and collect all fields in as few passes over the document as possible (avoid a separate `find_all(True)` scan per field).
+Use specific predicates if the target schema implies a Knowledge Graph (e.g., hasName, hasRole).
+Return ONLY the python code, wrapped in a markdown code block.
+"""
+
+# Used in "direct_json" mode, where the LLM produces the target value itself.
+DIRECT_JSON_SYSTEM_PROMPT = """You convert data of one type into another.
+Extract the information from the input and return it in the target type, strictly following the target schema.
+Use specific predicates if the target schema implies a Knowledge Graph (e.g., hasName, hasRole).
+"""
+
+_JSON_TYPES = {"object", "array", "string", "number", "integer", "boolean", "null"}
+
+def _is_json_declarable(schema: Dict[str, Any]) -> bool:
+    """True if the schema only uses plain JSON types (e.g. not a file/PDF type)."""
+    if schema.get("type") not in _JSON_TYPES:
+        return False
+    if "items" in schema and not _is_json_declarable(schema["items"]):
+        return False
+    return all(_is_json_declarable(prop) for prop in schema.get("properties", {}).values())
+
 class OntoGenesisAgent:
-    def __init__(self, llm_provider: str = "openai", model: Optional[str] = None, execution_mode: str = "local"):
+    def __init__(
+        self,
+        llm_provider: str = "openai",
+        model: Optional[str] = None,
+        execution_mode: Optional[str] = None,
+        synthesis_mode: Optional[str] = None
+    ):
         self.graph = CapabilityGraph()
         self.llm_provider = LLMFactory.create_provider(llm_provider, model=model)
         self.test_generator = TestGenerator()
         
+        # "docker" for untrusted code, "process" for a lighter rlimit-sandboxed worker,
+        # "warm" for a persistent worker process reused across attempts
+        execution_mode = execution_mode or os.getenv("ONTOGENESIS_EXECUTION_MODE", "local")
         if execution_mode == "docker":
             self.runner = DockerRunner()
+        elif execution_mode == "process":
+            self.runner = ProcessRunner()
+        elif execution_mode == "warm":
+            self.runner = WarmRunner()
         else:
             self.runner = CodeRunner()
+
+        # "direct_json" asks the LLM for the target value itself (structured output) when
+        # the target schema is plain JSON; "code_synthesis" always synthesizes a tool.
+        self.synthesis_mode = synthesis_mode or os.getenv("ONTOGENESIS_SYNTHESIS_MODE", "code_synthesis")
             
-        tracer.log_event("agent_init", {"llm_provider": llm_provider, "model": model, "execution_mode": execution_mode})
+        tracer.log_event("agent_init", {
+            "llm_provider": llm_provider,
+            "model": model,
+            "execution_mode": execution_mode,
+            "synthesis_mode": self.synthesis_mode
+        })
 
     def register_type(self, name: str, schema: Dict[str, Any]):
         """Registers a new data type in the ontology."""
@@ -55,7 +106,21 @@ class OntoGenesisAgent:
             tracer.end_span(outputs="Path exists (not implemented)")
             raise NotImplementedError("Multi-step execution not yet implemented.")
             
-        # 2. Synthesis Loop
+        # 2. Direct Generation (no tool), when the target can be declared as a JSON schema
+        target_schema = self.graph.graph.nodes[target_type]['schema']
+        if self.synthesis_mode == "direct_json" and _is_json_declarable(target_schema):
+            print(f"[Agent] Gap detected: {start_type} -> {target_type}. Generating result directly...")
+            try:
+                result = self._generate_direct(start_type, target_type, input_data)
+                if verification_fn:
+                    verification_fn(result)
+                tracer.end_span(outputs="Task completed (direct JSON)")
+                return result
+            except Exception as e:
+                print(f"[Agent] Direct generation failed: {e}. Falling back to code synthesis...")
+                tracer.log_event("direct_json_failed", {"error": str(e)})
+
+        # 3. Synthesis Loop
         print(f"[Agent] Gap detected: {start_type} -> {target_type}. Synthesizing tool...")
         
         current_code = None
@@ -79,9 +144,8 @@ class OntoGenesisAgent:
                     verification_fn(result) # Should raise exception on failure
                 elif isinstance(self.runner, DockerRunner):
                     print("[Agent] Verifying result (Schema-Based)...")
-                    target_schema = self.graph.graph.nodes[target_type]['schema']
-                    test_code = self.test_generator.generate_test_code(target_type, target_schema)
-                    self.runner.verify_result(result, test_code)
+                    test_files = self.test_generator.generate_test_files(target_type, target_schema)
+                    self.runner.verify_result(result, test_files)
                 
                 # Success!
                 tracer.end_span(outputs="Task completed")
@@ -101,20 +165,17 @@ class OntoGenesisAgent:
         start_schema = self.graph.graph.nodes[start_type]['schema']
         target_schema = self.graph.graph.nodes[target_type]['schema']
         
+        # Only the task-specific part goes in the user message; the instructions are a
+        # byte-identical system prompt so the provider can reuse its cached prefix.
         prompt = f"""
-You are an expert Python developer.
 We have a data type '{start_type}' with schema:
-{json.dumps(start_schema, indent=2)}
+{json.dumps(start_schema, indent=2, sort_keys=True)}
 
 We need to transform it into '{target_type}' with schema:
-{json.dumps(target_schema, indent=2)}
+{json.dumps(target_schema, indent=2, sort_keys=True)}
 
 Write a Python function `transform(input_data) -> output_data` that performs this conversion.
 The input is of type {start_type}.
-The output must strictly adhere to the target schema.
-If the input is HTML, use BeautifulSoup.
-Use specific predicates if the target schema implies a Knowledge Graph (e.g., hasName, hasRole).
-Return ONLY the python code, wrapped in a markdown code block.
 """
         if feedback and previous_code:
             prompt += f"""
@@ -127,9 +188,23 @@ ERROR:
 
 Fix the code to resolve the error.
 """
-        response = self.llm_provider.generate(prompt)
+        response = self.llm_provider.generate(prompt, system_prompt=SYNTHESIS_SYSTEM_PROMPT)
         return extract_code_block(response)
 
+    def _generate_direct(self, start_type: str, target_type: str, input_data: Any) -> Any:
+        """Asks the LLM for the target value itself, constrained to the target schema."""
+        target_schema = self.graph.graph.nodes[target_type]['schema']
+        if not isinstance(input_data, str):
+            input_data = json.dumps(input_data, indent=2)
+        prompt = f"""
+Convert this input of type '{start_type}' into '{target_type}'.
+
+INPUT:
+{input_data}
+"""
+        result = self.llm_provider.generate_json(prompt, target_schema, name=target_type, system_prompt=DIRECT_JSON_SYSTEM_PROMPT)
+        return validate_direct_result(result, target_schema, target_type)
+
     def _execute_tool(self, code: str, input_data: Any) -> Any:
         """Executes the generated code."""
         # We assume the entry point is always 'transform' for now
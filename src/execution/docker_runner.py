@@ -1,23 +1,140 @@
 import docker
+import hashlib
+import io
 import os
-import tempfile
-import json
-from typing import Any, Dict, Optional
+import socket
+import tarfile
+import time
+import queue
+import uuid
+import weakref
+from typing import Any, Dict, List, Optional
+from utils import json_codec
 from utils.tracer import tracer
 
+# Image with the synthesized tools' and tests' dependencies preinstalled, built
+# once on top of the base image so runs don't pay for a pip install every time.
+# The dependency layer comes before the wrapper so editing the wrapper only
+# rebuilds the last layer. The tag is derived from the build context, so
+# changing either the Dockerfile or the wrapper triggers a rebuild.
+RUNNER_IMAGE_NAME = "ontogenesis-runner"
+RUNNER_DOCKERFILE = """FROM {base_image}
+RUN pip install --no-cache-dir beautifulsoup4 fastjsonschema lxml orjson pytest
+WORKDIR /app
+COPY wrapper.py /app/wrapper.py
+"""
+
+# Static wrapper baked into the runner image. The input is read from
+# input.json instead of being interpolated into the source, the entry point
+# is passed on the command line, and the result is written with orjson.
+# It runs inside the job's working directory.
+WRAPPER_CODE = """
+import os
+import sys
+import orjson
+from bs4 import BeautifulSoup # Ensure dependencies are available
+
+def main():
+    try:
+        entry_point = sys.argv[1]
+
+        # The job's script.py and input.json are in the per-job working directory
+        sys.path.insert(0, os.getcwd())
+        import script
+
+        # Load input
+        with open("input.json", "rb") as f:
+            input_data = orjson.loads(f.read())
+        
+        # Call entry point
+        result = getattr(script, entry_point)(input_data)
+        
+        # Write result as JSON bytes
+        sys.stdout.buffer.write(orjson.dumps(result))
+        
+    except Exception as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
+"""
+
+# Pooled containers carry this label, set to "<hostname>:<pid>" of the owning process,
+# so containers left behind by a crashed process can be found and removed.
+RUNNER_LABEL = "ontogenesis.runner.owner"
+
+# Idle containers exit on their own after this long (and are auto-removed), which
+# bounds leaks when the owner can't clean up. The pool recycles a container once less
+# than a job's timeout plus RECYCLE_MARGIN seconds of its lifetime are left.
+CONTAINER_MAX_LIFETIME = 3600
+RECYCLE_MARGIN = 30
+
+# Jobs run under coreutils `timeout`, which exits with this code when the deadline passes
+# (the process gets SIGTERM, then SIGKILL 5s later if it is still running).
+TIMEOUT_EXIT_CODE = 124
+
+# Synthesized code runs as this unprivileged user, so it can't modify the image
+# (site-packages, /app/wrapper.py) or other jobs' directories.
+TOOL_USER = "nobody"
+
+def _tar_files(files: Dict[str, bytes], directory: Optional[str] = None) -> bytes:
+    """
+    Packs in-memory files into an uncompressed tar archive for put_archive,
+    optionally inside a new (root-owned, read-only for others) directory.
+    """
+    buffer = io.BytesIO()
+    now = int(time.time())
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        if directory:
+            info = tarfile.TarInfo(directory)
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o755
+            info.mtime = now
+            tar.addfile(info)
+        for name, data in files.items():
+            info = tarfile.TarInfo(f"{directory}/{name}" if directory else name)
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = now
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+def _pid_alive(pid: int) -> bool:
+    if os.name != "posix":
+        # No safe signal-0 probe on Windows; CONTAINER_MAX_LIFETIME bounds those leaks
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _remove_containers(containers: List[Any]):
+    for container in containers:
+        try:
+            container.remove(force=True)
+        except Exception as e:
+            print(f"Failed to remove runner container: {e}")
+    containers.clear()
+
 class DockerRunner:
     """
     Executes code in an isolated Docker container.
     """
-    def __init__(self, image: str = "python:3.12-slim"):
-        self.image = image
+    def __init__(self, image: str = "python:3.12-slim", pool_size: int = 2, timeout: float = 60.0):
+        self.base_image = image
+        self.timeout = timeout
         # Try to connect to Docker daemon on Windows named pipe
         try:
             self.client = docker.DockerClient(base_url='npipe:////./pipe/docker_engine')
         except Exception:
             # Fallback to default environment
             self.client = docker.from_env()
-        tracer.log_event("docker_runner_init", {"image": image})
+        self.api = self.client.api
+        tracer.log_event("docker_runner_init", {"image": image, "pool_size": pool_size})
         
         # Ensure image exists
         try:
@@ -26,153 +143,226 @@ class DockerRunner:
             print(f"Pulling Docker image: {image}...")
             self.client.images.pull(image)
 
+        self.image = self._ensure_runner_image()
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._reap_orphaned_containers()
+
+        # Keep a pool of idle containers and exec each job inside one of them,
+        # instead of paying container create/teardown on every call. Each job gets
+        # its own directory, which is removed afterwards.
+        self._containers: List[Any] = []
+        self._started: Dict[str, float] = {}  # container id -> time.monotonic() at start
+        self._pool: "queue.Queue[Any]" = queue.Queue()
+        # Verification runs in a separate container that synthesized code never runs in,
+        # so a tool can't plant modules or pytest config that its own tests would pick up.
+        self._verify_pool: "queue.Queue[Any]" = queue.Queue()
+        # Removes the containers when the runner is collected or the interpreter exits
+        self._finalizer = weakref.finalize(self, _remove_containers, self._containers)
+        for _ in range(pool_size):
+            self._pool.put(self._start_container())
+        self._verify_pool.put(self._start_container())
+
+    def _ensure_runner_image(self) -> str:
+        """Builds the runner image from the base image if it is not present yet."""
+        dockerfile = RUNNER_DOCKERFILE.format(base_image=self.base_image).encode("utf-8")
+        wrapper = WRAPPER_CODE.encode("utf-8")
+        tag = f"{RUNNER_IMAGE_NAME}:{hashlib.sha256(dockerfile + wrapper).hexdigest()[:12]}"
+        try:
+            self.client.images.get(tag)
+        except docker.errors.ImageNotFound:
+            print(f"Building Docker image: {tag}...")
+            context = _tar_files({"Dockerfile": dockerfile, "wrapper.py": wrapper})
+            self.client.images.build(fileobj=io.BytesIO(context), custom_context=True, tag=tag, rm=True)
+            tracer.log_event("docker_runner_image_built", {"image": tag, "base_image": self.base_image})
+        return tag
+
+    def _reap_orphaned_containers(self):
+        """Removes runner containers left behind by dead processes on this host."""
+        host = socket.gethostname()
+        try:
+            containers = self.client.containers.list(all=True, filters={"label": RUNNER_LABEL})
+        except Exception as e:
+            print(f"Failed to list runner containers: {e}")
+            return
+        for container in containers:
+            owner_host, _, owner_pid = container.labels.get(RUNNER_LABEL, "").rpartition(":")
+            if owner_host != host or not owner_pid.isdigit() or _pid_alive(int(owner_pid)):
+                continue
+            try:
+                container.remove(force=True)
+                tracer.log_event("docker_runner_reaped", {"container": container.id})
+            except Exception as e:
+                print(f"Failed to remove orphaned runner container: {e}")
+
+    def _start_container(self) -> Any:
+        """Starts an idle runner container (the wrapper is already in the image)."""
+        container = self.client.containers.run(
+            self.image,
+            command=["sleep", str(CONTAINER_MAX_LIFETIME)],
+            working_dir='/app',
+            labels={RUNNER_LABEL: self._owner},
+            auto_remove=True,
+            detach=True
+        )
+        self._containers.append(container)
+        self._started[container.id] = time.monotonic()
+        return container
+
+    def _checkout(self, pool: "queue.Queue[Any]") -> Any:
+        """
+        Takes a container from the pool, replacing it if it is no longer running or
+        could reach the end of its lifetime before a job finishes.
+        """
+        container = pool.get()
+        age = time.monotonic() - self._started.get(container.id, float("-inf"))
+        if age < CONTAINER_MAX_LIFETIME - self.timeout - RECYCLE_MARGIN:
+            try:
+                container.reload()
+                if container.status == "running":
+                    return container
+            except Exception:
+                pass
+        tracer.log_event("docker_runner_replaced", {"container": container.id, "age_s": age})
+        self._started.pop(container.id, None)
+        if container in self._containers:
+            self._containers.remove(container)
+        try:
+            container.remove(force=True)
+        except Exception:
+            pass  # Usually already gone (auto_remove)
+        try:
+            return self._start_container()
+        except Exception:
+            # Keep the pool size stable; the next checkout retries the replacement
+            pool.put(container)
+            raise
+
+    def _with_timeout(self, command: List[str]) -> List[str]:
+        return ["timeout", "-k", "5", f"{self.timeout:g}", *command]
+
+    def _cleanup_job(self, container: Any, job_dir: str):
+        try:
+            container.exec_run(["rm", "-rf", job_dir])
+        except Exception as e:
+            print(f"Failed to remove job directory {job_dir}: {e}")
+
     def run_code(self, code: str, entry_point: str, input_data: Any = None, **kwargs) -> Any:
         """
-        Executes the given code in a Docker container.
+        Executes the given code in one of the pooled runner containers.
         
         Strategy:
-        1. Create a temporary directory.
-        2. Write the code to `script.py`.
-        3. Write a wrapper script `main.py` that imports `script`, calls `entry_point`, and prints the result as JSON.
-        4. Mount the temp dir to the container.
-        5. Run the container and capture stdout.
+        1. Take an idle container from the pool (replacing it if it has died).
+        2. Stream the code (`script.py`) and the input (`input.json`) into a fresh
+           per-job directory as an in-memory tar archive; it is removed afterwards.
+        3. Run the static `wrapper.py` (imports `script`, calls `entry_point`, prints the result as JSON)
+           inside the container with `exec_run`, killed after `timeout` seconds, and capture stdout.
         """
         tracer.start_span("run_code_docker", {"entry_point": entry_point, "image": self.image})
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # 1. Write User Code
-            script_path = os.path.join(temp_dir, "script.py")
-            with open(script_path, "w", encoding="utf-8") as f:
-                f.write(code)
-                
-            # 2. Prepare Input Data
-            input_json = json.dumps(input_data) if input_data is not None else "null"
-            
-            # 3. Write Wrapper Script
-            wrapper_code = f"""
-import sys
-import json
-import script
-from bs4 import BeautifulSoup # Ensure dependencies are available
+        try:
+            container = self._checkout(self._pool)
+        except Exception as e:
+            tracer.end_span(error=str(e))
+            raise RuntimeError(f"Docker execution failed: {e}")
+        job_dir = f"/tmp/job-{uuid.uuid4().hex}"
+        try:
+            return self._run_in_container(container, job_dir, code, entry_point, input_data)
+        finally:
+            self._cleanup_job(container, job_dir)
+            self._pool.put(container)
 
-def main():
-    try:
-        # Load input
-        input_data = {input_json}
-        
-        # Call entry point
-        result = script.{entry_point}(input_data)
-        
-        # Print result as JSON
-        print(json.dumps(result))
-        
-    except Exception as e:
-        print(f"ERROR: {{e}}", file=sys.stderr)
-        sys.exit(1)
+    def _run_in_container(self, container: Any, job_dir: str, code: str, entry_point: str, input_data: Any) -> Any:
+        # 1-2. Copy User Code and Input Data into a fresh job directory
+        name = job_dir.rsplit("/", 1)[1]
+        archive = _tar_files({
+            "script.py": code.encode("utf-8"),
+            "input.json": json_codec.dumps(input_data),
+        }, directory=name)
 
-if __name__ == "__main__":
-    main()
-"""
-            wrapper_path = os.path.join(temp_dir, "wrapper.py")
-            with open(wrapper_path, "w", encoding="utf-8") as f:
-                f.write(wrapper_code)
+        # 3. Run inside the container, as an unprivileged user
+        try:
+            container.put_archive("/tmp", archive)
+            # -B: the job directory is read-only for the tool user, so don't try writing .pyc files
+            exit_code, (stdout, stderr) = container.exec_run(
+                self._with_timeout(["python", "-B", "/app/wrapper.py", entry_point]),
+                workdir=job_dir,
+                user=TOOL_USER,
+                demux=True
+            )
+        except Exception as e:
+            tracer.end_span(error=str(e))
+            raise RuntimeError(f"Docker execution failed: {e}")
 
-            # 4. Run Container
-            try:
-                # We need to install bs4 if it's not in the base image
-                # For efficiency, we should build a custom image, but for now we'll pip install on the fly (slow)
-                # OR assume the user provides an image with dependencies.
-                # Let's use a simple command that installs dependencies first.
-                command = "sh -c 'pip install beautifulsoup4 > /dev/null 2>&1 && python /app/wrapper.py'"
-                
-                logs = self.client.containers.run(
-                    self.image,
-                    command=command,
-                    volumes={temp_dir: {'bind': '/app', 'mode': 'rw'}},
-                    working_dir='/app',
-                    remove=True,
-                    stderr=True
-                )
-                
-                output = logs.decode("utf-8").strip()
-                
-                # Parse Result
-                try:
-                    result = json.loads(output)
-                    tracer.end_span(outputs="Execution successful")
-                    return result
-                except json.JSONDecodeError:
-                    tracer.end_span(error=f"Invalid JSON output: {output}")
-                    raise RuntimeError(f"Execution failed (Invalid JSON): {output}")
-                    
-            except docker.errors.ContainerError as e:
-                error_msg = e.stderr.decode("utf-8") if e.stderr else str(e)
-                tracer.end_span(error=f"Container error: {error_msg}")
-                raise RuntimeError(f"Container execution failed: {error_msg}")
-            except Exception as e:
-                tracer.end_span(error=str(e))
-                raise RuntimeError(f"Docker execution failed: {e}")
+        if exit_code == TIMEOUT_EXIT_CODE:
+            tracer.end_span(error=f"Timed out after {self.timeout}s")
+            raise RuntimeError(f"Container execution timed out after {self.timeout}s")
+        if exit_code != 0:
+            error_msg = (stderr or stdout or b"").decode("utf-8")
+            tracer.end_span(error=f"Container error: {error_msg}")
+            raise RuntimeError(f"Container execution failed: {error_msg}")
 
-    def verify_result(self, result: Any, test_code: str) -> bool:
+        output = stdout or b""
+        
+        # Parse Result
+        try:
+            result = json_codec.loads(output)
+        except ValueError:
+            output = output.decode("utf-8", errors="replace").strip()
+            tracer.end_span(error=f"Invalid JSON output: {output}")
+            raise RuntimeError(f"Execution failed (Invalid JSON): {output}")
+
+        tracer.end_span(outputs="Execution successful")
+        return result
+
+    def verify_result(self, result: Any, test_files: Dict[str, str]) -> bool:
         """
-        Verifies the result using the provided pytest code.
+        Verifies the result using the provided pytest files (keyed by file name),
+        in a clean job directory of the dedicated verification container.
         """
         tracer.start_span("verify_result_docker", {"image": self.image})
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # 1. Write Result
-            with open(os.path.join(temp_dir, "result.json"), "w", encoding="utf-8") as f:
-                json.dump(result, f)
-                
-            # 2. Write Test Code
-            with open(os.path.join(temp_dir, "test_generated.py"), "w", encoding="utf-8") as f:
-                f.write(test_code)
-                
-            # 3. Run Pytest
-            try:
-                # Install pytest if needed (slow, but robust)
-                command = "sh -c 'pip install pytest > /dev/null 2>&1 && pytest /app/test_generated.py'"
-                
-                # Run and capture output
-                logs = self.client.containers.run(
-                    self.image,
-                    command=command,
-                    volumes={temp_dir: {'bind': '/app', 'mode': 'rw'}},
-                    working_dir='/app',
-                    remove=True,
-                    stderr=True,
-                    stdout=True
-                )
-                
-                tracer.end_span(outputs="Verification passed")
-                return True
-                
-            except docker.errors.ContainerError as e:
-                # Pytest failed (exit code 1)
-                # Pytest failed (exit code 1)
-                # Capture output manually by running detached container
-                
-                # Better approach: Run the container with detach=True, wait, then get logs.
-                container = self.client.containers.run(
-                    self.image,
-                    command=command,
-                    volumes={temp_dir: {'bind': '/app', 'mode': 'rw'}},
-                    working_dir='/app',
-                    detach=True,
-                    stderr=True,
-                    stdout=True
-                )
-                
-                result = container.wait()
-                logs = container.logs().decode("utf-8")
-                container.remove()
-                
-                if result["StatusCode"] != 0:
-                    tracer.end_span(error=f"Verification failed: {logs}")
-                    raise RuntimeError(f"Verification failed: {logs}")
-                
-                tracer.end_span(outputs="Verification passed")
-                return True
-            except Exception as e:
-                tracer.end_span(error=str(e))
-                raise RuntimeError(f"Docker verification failed: {e}")
+        job_dir = f"/tmp/job-{uuid.uuid4().hex}"
+        container = None
+        try:
+            container = self._checkout(self._verify_pool)
+
+            # 1-2. Copy Result and Test Files into a fresh job directory (in memory, no host scratch directory)
+            files = {name: content.encode("utf-8") for name, content in test_files.items()}
+            files["result.json"] = json_codec.dumps(result)
+            container.put_archive("/tmp", _tar_files(files, directory=job_dir.rsplit("/", 1)[1]))
+            test_paths = [f"{job_dir}/{name}" for name in test_files if name.startswith("test_")]
+
+            # 3. Run Pytest (baked into the runner image) through the low-level exec API,
+            # consuming the output while it runs and reading the exit code afterwards
+            exec_id = self.api.exec_create(
+                container.id,
+                self._with_timeout(["pytest", "-p", "no:cacheprovider", "--rootdir", job_dir, *test_paths]),
+                workdir=job_dir
+            )["Id"]
+            output = bytearray()
+            for chunk in self.api.exec_start(exec_id, stream=True):
+                output.extend(chunk)
+            status = self.api.exec_inspect(exec_id)["ExitCode"]
+        except Exception as e:
+            tracer.end_span(error=str(e))
+            raise RuntimeError(f"Docker verification failed: {e}")
+        finally:
+            if container is not None:
+                self._cleanup_job(container, job_dir)
+                self._verify_pool.put(container)
+
+        logs = output.decode("utf-8", errors="replace")
+        if status == TIMEOUT_EXIT_CODE:
+            tracer.end_span(error=f"Verification timed out after {self.timeout}s")
+            raise RuntimeError(f"Verification timed out after {self.timeout}s: {logs}")
+        if status != 0:
+            # Pytest failed (exit code 1)
+            tracer.end_span(error=f"Verification failed: {logs}")
+            raise RuntimeError(f"Verification failed: {logs}")
+        
+        tracer.end_span(outputs="Verification passed")
+        return True
+
+    def close(self):
+        """Stops and removes the pooled runner containers."""
+        self._finalizer()
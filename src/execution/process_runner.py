@@ -0,0 +1,142 @@
+import multiprocessing
+import sys
+from types import CodeType
+from typing import Any, Dict, Optional, Tuple, Union
+from execution.runner import _compile
+from utils.tracer import tracer
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; the worker then runs without rlimits.
+    resource = None
+
+def _apply_limits(cpu_seconds: Optional[int], memory_bytes: Optional[int], max_open_files: Optional[int]):
+    if resource is None:
+        return
+    for limit, value in (
+        (resource.RLIMIT_CPU, cpu_seconds),
+        (resource.RLIMIT_AS, memory_bytes),
+        (resource.RLIMIT_NOFILE, max_open_files),
+    ):
+        if value is not None:
+            resource.setrlimit(limit, (value, value))
+
+def _worker(conn, code: Union[str, CodeType], entry_point: str, kwargs: Dict[str, Any], limits: Tuple[Optional[int], ...]):
+    """Runs in the child process. Sends back a (status, payload) tuple."""
+    try:
+        _apply_limits(*limits)
+        scope: Dict[str, Any] = {}
+        try:
+            exec(code, scope, scope)
+        except Exception as e:
+            conn.send(("define_error", str(e)))
+            return
+
+        func = scope.get(entry_point)
+        if func is None:
+            conn.send(("missing", None))
+            return
+        if not callable(func):
+            conn.send(("not_callable", None))
+            return
+
+        try:
+            result = func(**kwargs)
+        except Exception as e:
+            conn.send(("exec_error", str(e)))
+            return
+
+        try:
+            conn.send(("ok", result))
+        except Exception as e:
+            conn.send(("exec_error", f"Result could not be sent back: {e}"))
+    finally:
+        conn.close()
+
+class ProcessRunner:
+    """
+    Executes Python code strings in a separate worker process with resource limits
+    (CPU time, address space, open files).
+    Much cheaper than Docker, but only meant for trusted code: the worker has the
+    same filesystem and network access as the caller. Use DockerRunner otherwise.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 60.0,
+        cpu_seconds: Optional[int] = 30,
+        memory_bytes: Optional[int] = 1024 * 1024 * 1024,
+        max_open_files: Optional[int] = 256,
+    ):
+        self.timeout = timeout
+        self.limits = (cpu_seconds, memory_bytes, max_open_files)
+        # fork skips re-importing the interpreter state, but is only safe on Linux (macOS
+        # system libraries break in forked children); elsewhere use the platform default.
+        # The parent is already multi-threaded (the tracer's writer thread), so a forked
+        # child must not touch the tracer: _worker only runs the code and replies.
+        self._fork = sys.platform.startswith("linux")
+        self._ctx = multiprocessing.get_context("fork" if self._fork else None)
+
+    def run_code(self, code: str, entry_point: str, **kwargs) -> Any:
+        """
+        Executes the given code in a worker process and calls the entry point function.
+
+        Args:
+            code: The Python code string to execute.
+            entry_point: The name of the function to call.
+            **kwargs: Arguments to pass to the entry point function.
+
+        Returns:
+            The result of the entry point function (must be picklable).
+        """
+        tracer.start_span("run_code_process", {"entry_point": entry_point, "code_length": len(code)})
+
+        # Compile in the parent so the shared cache is reused across runs; a forked
+        # child inherits the code object, while spawned children need the source.
+        try:
+            compiled = _compile(code)
+        except Exception as e:
+            tracer.end_span(error=f"Definition failed: {e}")
+            raise RuntimeError(f"Failed to define code: {e}")
+
+        parent_conn, child_conn = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker,
+            args=(child_conn, compiled if self._fork else code, entry_point, kwargs, self.limits),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+
+        try:
+            if not parent_conn.poll(self.timeout):
+                process.kill()
+                tracer.end_span(error=f"Timed out after {self.timeout}s")
+                raise RuntimeError(f"Failed to execute entry point '{entry_point}': timed out after {self.timeout}s")
+            try:
+                status, payload = parent_conn.recv()
+            except EOFError:
+                # The worker died without reporting (e.g. killed by an rlimit)
+                process.join()
+                tracer.end_span(error=f"Worker exited with code {process.exitcode}")
+                raise RuntimeError(f"Failed to execute entry point '{entry_point}': worker exited with code {process.exitcode}")
+        finally:
+            parent_conn.close()
+            process.join()
+
+        if status == "define_error":
+            tracer.end_span(error=f"Definition failed: {payload}")
+            raise RuntimeError(f"Failed to define code: {payload}")
+        if status == "missing":
+            tracer.end_span(error=f"Entry point '{entry_point}' not found")
+            raise ValueError(f"Entry point '{entry_point}' not found in executed code.")
+        if status == "not_callable":
+            tracer.end_span(error=f"Entry point '{entry_point}' is not callable")
+            raise ValueError(f"Entry point '{entry_point}' is not callable.")
+        if status == "exec_error":
+            tracer.end_span(error=f"Execution failed: {payload}")
+            raise RuntimeError(f"Failed to execute entry point '{entry_point}': {payload}")
+
+        tracer.end_span(outputs="Execution successful")
+        return payload
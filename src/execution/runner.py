@@ -1,12 +1,36 @@
-from typing import Any, Dict, Optional
+import functools
+import hashlib
+import pickle
+import queue
+import struct
+import subprocess
+import sys
+import threading
+from collections import OrderedDict
+from types import CodeType
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 from utils.tracer import tracer
 
+@functools.lru_cache(maxsize=256)
+def _compile(code: str) -> CodeType:
+    """Compiles a code string once; retries and batches reuse the code object."""
+    return compile(code, "<synthesized>", "exec")
+
 class CodeRunner:
     """
     Executes Python code strings in a local namespace.
+    The namespace of each distinct code string is kept warm, so imports and
+    definitions run once and repeated calls go straight to the entry point.
+    At most max_scopes namespaces are kept; the least recently used is evicted.
     WARNING: This uses `exec` and is not secure for untrusted code.
     """
 
+    def __init__(self, max_scopes: int = 256):
+        # Executed scopes (in LRU order) and resolved entry points, keyed by a digest of the code
+        self.max_scopes = max_scopes
+        self._scopes: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._funcs: Dict[Tuple[bytes, str], Callable] = {}
+
     def run_code(self, code: str, entry_point: str, **kwargs) -> Any:
         """
         Executes the given code and calls the entry point function.
@@ -21,16 +45,40 @@ class CodeRunner:
         """
         tracer.start_span("run_code", {"entry_point": entry_point, "code_length": len(code)})
         
-        # Use a single dictionary for both globals and locals to ensure 
-        # that functions defined in the code can access imports defined in the code.
-        scope: Dict[str, Any] = {}
-        
+        key = hashlib.blake2b(code.encode("utf-8"), digest_size=16).digest()
+        func = self._funcs.get((key, entry_point))
+        if func is None:
+            func = self._load_entry_point(key, code, entry_point)
+        else:
+            self._scopes.move_to_end(key)
+
         try:
-            # Execute the code definition
-            exec(code, scope, scope)
+            # Call the function
+            result = func(**kwargs)
+            tracer.end_span(outputs="Execution successful")
+            return result
         except Exception as e:
-            tracer.end_span(error=f"Definition failed: {e}")
-            raise RuntimeError(f"Failed to define code: {e}")
+            tracer.end_span(error=f"Execution failed: {e}")
+            raise RuntimeError(f"Failed to execute entry point '{entry_point}': {e}")
+
+    def _load_entry_point(self, key: bytes, code: str, entry_point: str) -> Callable:
+        """Executes the code once (if needed) and resolves the entry point in its scope."""
+        scope = self._scopes.get(key)
+        if scope is not None:
+            self._scopes.move_to_end(key)
+        else:
+            # Use a single dictionary for both globals and locals to ensure 
+            # that functions defined in the code can access imports defined in the code.
+            scope = {}
+            try:
+                # Execute the code definition
+                exec(_compile(code), scope, scope)
+            except Exception as e:
+                tracer.end_span(error=f"Definition failed: {e}")
+                raise RuntimeError(f"Failed to define code: {e}")
+            self._scopes[key] = scope
+            if len(self._scopes) > self.max_scopes:
+                self._evict_oldest()
 
         if entry_point not in scope:
             tracer.end_span(error=f"Entry point '{entry_point}' not found")
@@ -42,11 +90,224 @@ class CodeRunner:
             tracer.end_span(error=f"Entry point '{entry_point}' is not callable")
             raise ValueError(f"Entry point '{entry_point}' is not callable.")
 
+        self._funcs[(key, entry_point)] = func
+        return func
+
+    def _evict_oldest(self):
+        """Drops the least recently used scope together with its resolved entry points."""
+        evicted, _ = self._scopes.popitem(last=False)
+        for func_key in [k for k in self._funcs if k[0] == evicted]:
+            del self._funcs[func_key]
+
+# Source of the WarmRunner worker process. Requests and replies are pickled and
+# length-prefixed (4-byte big-endian) on the worker's stdin/stdout; the worker's
+# own stdout is redirected to stderr so prints in synthesized code can't corrupt
+# the stream.
+_WARM_WORKER_CODE = r"""
+import functools
+import importlib
+import os
+import pickle
+import queue
+import struct
+import sys
+
+@functools.lru_cache(maxsize=256)
+def compile_code(code):
+    return compile(code, "<synthesized>", "exec")
+
+def run(code, entry_point, kwargs):
+    scope = {}
+    try:
+        exec(compile_code(code), scope, scope)
+    except Exception as e:
+        return ("define_error", str(e))
+    func = scope.get(entry_point)
+    if func is None:
+        return ("missing", None)
+    if not callable(func):
+        return ("not_callable", None)
+    try:
+        return ("ok", func(**kwargs))
+    except Exception as e:
+        return ("exec_error", str(e))
+
+def main():
+    replies = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    requests = sys.stdin.buffer
+
+    for name in filter(None, sys.argv[1].split(",")):
         try:
-            # Call the function
-            result = func(**kwargs)
-            tracer.end_span(outputs="Execution successful")
-            return result
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+    while True:
+        header = requests.read(4)
+        if len(header) < 4:
+            return
+        payload = requests.read(struct.unpack(">I", header)[0])
+        try:
+            reply = run(*pickle.loads(payload))
+            data = pickle.dumps(reply)
         except Exception as e:
-            tracer.end_span(error=f"Execution failed: {e}")
-            raise RuntimeError(f"Failed to execute entry point '{entry_point}': {e}")
+            data = pickle.dumps(("exec_error", f"Request or result could not be transferred: {e}"))
+        replies.write(struct.pack(">I", len(data)) + data)
+        replies.flush()
+
+main()
+"""
+
+def _raise_for_status(status: str, payload: Any, entry_point: str) -> Any:
+    """Turns a worker reply into the entry point's result, or the same errors CodeRunner raises."""
+    if status == "define_error":
+        raise RuntimeError(f"Failed to define code: {payload}")
+    if status == "missing":
+        raise ValueError(f"Entry point '{entry_point}' not found in executed code.")
+    if status == "not_callable":
+        raise ValueError(f"Entry point '{entry_point}' is not callable.")
+    if status == "exec_error":
+        raise RuntimeError(f"Failed to execute entry point '{entry_point}': {payload}")
+    return payload
+
+class WarmRunner:
+    """
+    Executes Python code strings in a persistent worker subprocess that imports the
+    usual dependencies (bs4, lxml) once at start-up. Runs and retries then skip the
+    interpreter start-up and imports, while crashes and hangs in the synthesized
+    code stay out of the caller's process (the worker is restarted as needed).
+    Not a security boundary: use DockerRunner for untrusted code.
+    """
+
+    def __init__(self, preload: Sequence[str] = ("json", "bs4", "lxml"), timeout: Optional[float] = 60.0):
+        self.preload = tuple(preload)
+        self.timeout = timeout
+        self._proc: Optional[subprocess.Popen] = None
+        self._replies: "queue.Queue[Any]" = queue.Queue()
+
+    def _worker(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(
+                [sys.executable, "-c", _WARM_WORKER_CODE, ",".join(self.preload)],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE
+            )
+            # Replies are read by a thread and handed over through a queue, so waiting
+            # with a timeout works on every platform (select() can't wait on pipes on Windows).
+            self._replies = queue.Queue()
+            threading.Thread(target=self._read_replies, args=(self._proc, self._replies), daemon=True).start()
+        return self._proc
+
+    @staticmethod
+    def _read_replies(proc: subprocess.Popen, replies: "queue.Queue[Any]"):
+        """Puts each decoded reply on the queue; EOFError once the worker is gone."""
+        try:
+            while True:
+                header = proc.stdout.read(4)
+                if len(header) < 4:
+                    break
+                data = proc.stdout.read(struct.unpack(">I", header)[0])
+                try:
+                    replies.put(pickle.loads(data))
+                except Exception as e:
+                    # e.g. a result whose class only exists in the worker
+                    replies.put(e)
+        except (OSError, ValueError):
+            pass  # Pipe closed under us (worker killed)
+        replies.put(EOFError())
+
+    def _send(self, proc: subprocess.Popen, frames: List[bytes]):
+        try:
+            for frame in frames:
+                proc.stdin.write(frame)
+            proc.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            pass  # The worker died; the reader reports it
+
+    def _submit(self, jobs: List[Tuple[str, str, Dict[str, Any]]]) -> List[Tuple[str, Any]]:
+        """Sends all jobs to the worker, then collects one (status, payload) reply per job."""
+        proc = self._worker()
+        replies_queue = self._replies
+        frames = []
+        for job in jobs:
+            data = pickle.dumps(job)
+            frames.append(struct.pack(">I", len(data)) + data)
+
+        # Write from a separate thread so large batches can't deadlock on full pipes
+        writer = threading.Thread(target=self._send, args=(proc, frames), daemon=True)
+        writer.start()
+        replies = []
+        for _ in jobs:
+            try:
+                reply = replies_queue.get(timeout=self.timeout)
+            except queue.Empty:
+                self.close()
+                raise RuntimeError(f"Worker timed out after {self.timeout}s")
+            if isinstance(reply, EOFError):
+                code = proc.wait()
+                self._proc = None
+                raise RuntimeError(f"Worker exited with code {code}")
+            if isinstance(reply, Exception):
+                self.close()
+                raise RuntimeError(f"Result could not be received: {reply}")
+            replies.append(reply)
+        writer.join()
+        return replies
+
+    def run_code(self, code: str, entry_point: str, **kwargs) -> Any:
+        """
+        Executes the given code in the warm worker and calls the entry point function.
+
+        Args:
+            code: The Python code string to execute.
+            entry_point: The name of the function to call.
+            **kwargs: Arguments to pass to the entry point function (must be picklable).
+
+        Returns:
+            The result of the entry point function (must be picklable).
+        """
+        tracer.start_span("run_code_warm", {"entry_point": entry_point, "code_length": len(code)})
+        try:
+            (status, payload), = self._submit([(code, entry_point, kwargs)])
+            result = _raise_for_status(status, payload, entry_point)
+        except Exception as e:
+            tracer.end_span(error=str(e))
+            raise
+        tracer.end_span(outputs="Execution successful")
+        return result
+
+    def run_batch(self, codes: List[str], entry_point: str, **kwargs) -> List[Any]:
+        """
+        Runs several candidate code strings on the same arguments in one round trip.
+
+        Returns:
+            One entry per candidate, in order: the entry point's result, or the
+            exception run_code would have raised for that candidate.
+        """
+        tracer.start_span("run_batch_warm", {"entry_point": entry_point, "num_candidates": len(codes)})
+        try:
+            replies = self._submit([(code, entry_point, kwargs) for code in codes])
+        except Exception as e:
+            tracer.end_span(error=str(e))
+            raise
+
+        results = []
+        for status, payload in replies:
+            try:
+                results.append(_raise_for_status(status, payload, entry_point))
+            except (RuntimeError, ValueError) as e:
+                results.append(e)
+        tracer.end_span(outputs={"succeeded": sum(status == "ok" for status, _ in replies)})
+        return results
+
+    def close(self):
+        """Stops the worker process."""
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+    def __del__(self):
+        self.close()
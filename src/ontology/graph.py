@@ -1,50 +1,111 @@
-from typing import List, Dict, Any
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple
 import os
+import sys
 import networkx as nx
-import matplotlib.pyplot as plt
 from .types import DataType
 from .tools import Tool
+from utils import json_codec
 from utils.tracer import tracer
 
 class CapabilityGraph:
     def __init__(self):
         self.graph = nx.DiGraph()
+        # Plain adjacency mirror of self.graph for cheap traversals, and memoized
+        # paths. Every mutation bumps _version and drops the memoized results.
+        self._adj: Dict[str, List[str]] = {}
+        self._radj: Dict[str, List[str]] = {}
+        self._path_cache: Dict[Tuple[str, str], List[str]] = {}
+        self._version = 0
+        self._layout_cache: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._reach_cache: Optional[Tuple[int, Any]] = None
+
+    def _invalidate(self):
+        self._version += 1
+        self._path_cache.clear()
 
     def add_type(self, type_node: DataType):
         self.graph.add_node(type_node.name, schema=type_node.schema_def)
+        self._adj.setdefault(type_node.name, [])
+        self._radj.setdefault(type_node.name, [])
+        self._invalidate()
 
     def add_tool(self, tool: Tool):
+        if not self.graph.has_edge(tool.input_type, tool.output_type):
+            self._adj.setdefault(tool.input_type, []).append(tool.output_type)
+            self._adj.setdefault(tool.output_type, [])
+            self._radj.setdefault(tool.output_type, []).append(tool.input_type)
+            self._radj.setdefault(tool.input_type, [])
         self.graph.add_edge(tool.input_type, tool.output_type, tool=tool)
+        self._invalidate()
 
     def find_path(self, start_type: str, end_type: str) -> List[str]:
-        try:
-            return nx.shortest_path(self.graph, start_type, end_type)
-        except nx.NetworkXNoPath:
-            return []
+        """Shortest path (fewest tools) from start_type to end_type, or [] if none exists."""
+        for node in (start_type, end_type):
+            if node not in self._adj:
+                raise nx.NodeNotFound(f"Node {node} not in graph")
+
+        key = (start_type, end_type)
+        path = self._path_cache.get(key)
+        if path is None:
+            reach = self._reachability()
+            if reach is not None and not reach[1][start_type] >> reach[0][end_type] & 1:
+                # Unreachable according to the bitsets, no need to search
+                path = []
+            else:
+                path = self._bfs_path(start_type, end_type)
+            self._path_cache[key] = path
+        return list(path)
+
+    def _bfs_path(self, start_type: str, end_type: str) -> List[str]:
+        parent: Dict[str, Any] = {start_type: None}
+        queue = deque([start_type])
+        while queue:
+            node = queue.popleft()
+            if node == end_type:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = parent[node]
+                return path[::-1]
+            for succ in self._adj[node]:
+                if succ not in parent:
+                    parent[succ] = node
+                    queue.append(succ)
+        return []
 
     def detect_gap(self, start_type: str, end_type: str) -> Dict[str, Any]:
         """
-        Detects a gap between start_type and end_type using bidirectional search.
-        Finds the intersection of Forward Reachable and Backward Required sets.
+        Detects a gap between start_type and end_type.
+        On an acyclic graph this is a lookup in the precomputed reachability
+        bitsets. Otherwise a bidirectional search expands a forward frontier
+        from start_type and a backward frontier from end_type until they meet
+        (a path exists) or both are exhausted, leaving the Forward Reachable
+        and Backward Required sets.
         """
         tracer.start_span("detect_gap", {"start_type": start_type, "end_type": end_type})
         
-        # 1. Check direct path first (optimization)
-        if self.find_path(start_type, end_type):
+        for node in (start_type, end_type):
+            if node not in self._adj:
+                tracer.end_span(error=f"Node {node} not in graph")
+                raise nx.NodeNotFound(f"Node {node} not in graph")
+
+        reach = self._reachability()
+        if reach is not None:
+            index, forward_bits, backward_bits, order = reach
+            met = bool(forward_bits[start_type] >> index[end_type] & 1)
+            if not met:
+                forward_reachable = self._bits_to_nodes(forward_bits[start_type], order)
+                backward_required = self._bits_to_nodes(backward_bits[end_type], order)
+        else:
+            met, forward_reachable, backward_required = self._bidirectional_search(start_type, end_type)
+
+        if met:
             result = {"gap": False}
             tracer.end_span(outputs=result)
             return result
 
-        # 2. Forward Search (Reachable types from start)
-        forward_reachable = self.forward_search(start_type)
-        
-        # 3. Backward Search (Types that can reach end)
-        backward_required = self.backward_search(end_type)
-        
-        # 4. Find Intersection
-        intersection = forward_reachable.intersection(backward_required)
-        
-        # 5. Identify the "Best" Gap
+        # Identify the "Best" Gap
         # For v1.1, we simply propose bridging the start_type to the end_type directly.
         
         print(f"[Graph] Forward Reachable: {forward_reachable}")
@@ -60,17 +121,118 @@ class CapabilityGraph:
         tracer.end_span(outputs=result)
         return result
 
+    def _bidirectional_search(self, start_type: str, end_type: str) -> Tuple[bool, set, set]:
+        """Returns (met, forward_reachable, backward_required); the sets are complete only if not met."""
+        forward_reachable = {start_type}
+        backward_required = {end_type}
+        forward_frontier = [start_type]
+        backward_frontier = [end_type]
+        met = start_type == end_type
+
+        while not met and (forward_frontier or backward_frontier):
+            # Expand the smaller non-empty frontier
+            if forward_frontier and (not backward_frontier or len(forward_frontier) <= len(backward_frontier)):
+                adj, visited, other, frontier = self._adj, forward_reachable, backward_required, forward_frontier
+            else:
+                adj, visited, other, frontier = self._radj, backward_required, forward_reachable, backward_frontier
+
+            next_frontier = []
+            for node in frontier:
+                for neighbor in adj[node]:
+                    if neighbor in visited:
+                        continue
+                    if neighbor in other:
+                        met = True
+                        break
+                    visited.add(neighbor)
+                    next_frontier.append(neighbor)
+                if met:
+                    break
+            frontier[:] = next_frontier
+
+        return met, forward_reachable, backward_required
+
+    def _reachability(self) -> Optional[Tuple[Dict[str, int], Dict[str, int], Dict[str, int], List[str]]]:
+        """
+        Reachability bitsets for an acyclic graph, recomputed only after mutations.
+        Each node gets a bit index in topological order; forward_bits[u] has the bit
+        of every node reachable from u, backward_bits[v] of every node that reaches v.
+        Returns None if the graph has a cycle.
+        """
+        if self._reach_cache is not None and self._reach_cache[0] == self._version:
+            return self._reach_cache[1]
+
+        # Kahn's algorithm over the adjacency mirror
+        in_degree = {node: len(preds) for node, preds in self._radj.items()}
+        order = [node for node, degree in in_degree.items() if degree == 0]
+        for node in order:
+            for succ in self._adj[node]:
+                in_degree[succ] -= 1
+                if in_degree[succ] == 0:
+                    order.append(succ)
+
+        reach = None
+        if len(order) == len(self._adj):
+            index = {node: i for i, node in enumerate(order)}
+            forward_bits: Dict[str, int] = {}
+            for node in reversed(order):
+                bits = 1 << index[node]
+                for succ in self._adj[node]:
+                    bits |= forward_bits[succ]
+                forward_bits[node] = bits
+            backward_bits: Dict[str, int] = {}
+            for node in order:
+                bits = 1 << index[node]
+                for pred in self._radj[node]:
+                    bits |= backward_bits[pred]
+                backward_bits[node] = bits
+            reach = (index, forward_bits, backward_bits, order)
+
+        self._reach_cache = (self._version, reach)
+        return reach
+
+    @staticmethod
+    def _bits_to_nodes(bits: int, order: List[str]) -> set:
+        nodes = set()
+        while bits:
+            low = bits & -bits
+            nodes.add(order[low.bit_length() - 1])
+            bits ^= low
+        return nodes
+
+    def _reachable(self, adj: Dict[str, List[str]], node: str) -> set:
+        seen = {node}
+        queue = deque([node])
+        while queue:
+            for neighbor in adj[queue.popleft()]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    queue.append(neighbor)
+        return seen
+
     def forward_search(self, start_node: str) -> set:
         """Returns all nodes reachable from start_node."""
-        if start_node not in self.graph:
+        if start_node not in self._adj:
             return set()
-        return set(nx.descendants(self.graph, start_node)) | {start_node}
+        return self._reachable(self._adj, start_node)
 
     def backward_search(self, end_node: str) -> set:
         """Returns all nodes that can reach end_node."""
-        if end_node not in self.graph:
+        if end_node not in self._radj:
             return set()
-        return set(nx.ancestors(self.graph, end_node)) | {end_node}
+        return self._reachable(self._radj, end_node)
+
+    def _layout(self) -> Dict[str, Any]:
+        """Node positions for visualize(), reused until the graph changes."""
+        if self._layout_cache is not None and self._layout_cache[0] == self._version:
+            return self._layout_cache[1]
+        try:
+            # Graphviz computes the layout natively (needs pygraphviz)
+            pos = nx.nx_agraph.graphviz_layout(self.graph, prog="dot")
+        except ImportError:
+            pos = nx.spring_layout(self.graph, seed=42, iterations=30)
+        self._layout_cache = (self._version, pos)
+        return pos
 
     def visualize(self, output_path: str = "ontology_graph.png"):
         """
@@ -78,8 +240,15 @@ class CapabilityGraph:
         """
         tracer.start_span("visualize_graph", {"output_path": output_path})
         try:
+            # Imported lazily: matplotlib is slow to import and only needed here.
+            # Use the headless Agg backend unless the caller already set up pyplot.
+            import matplotlib
+            if "matplotlib.pyplot" not in sys.modules:
+                matplotlib.use("Agg")
+            import matplotlib.pyplot as plt
+
             plt.figure(figsize=(12, 8))
-            pos = nx.spring_layout(self.graph)
+            pos = self._layout()
             
             # Draw nodes
             nx.draw_networkx_nodes(self.graph, pos, node_size=2000, node_color='lightblue')
@@ -123,26 +292,27 @@ class CapabilityGraph:
                 data["edges"].append({
                     "source": u,
                     "target": v,
-                    "tool": tool.model_dump()
+                    "tool": tool.dump_cached()
                 })
         
-        import json
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        with open(path, "wb") as f:
+            f.write(json_codec.dumps(data, indent=True))
         tracer.end_span(outputs="Graph saved to JSON")
 
     def load_from_json(self, path: str):
         """Loads the graph state from a JSON file."""
         tracer.start_span("load_graph", {"path": path})
-        import json
         if not os.path.exists(path):
             tracer.end_span(error="File not found")
             return
 
-        with open(path, "r") as f:
-            data = json.load(f)
+        with open(path, "rb") as f:
+            data = json_codec.loads(f.read())
             
         self.graph.clear()
+        self._adj.clear()
+        self._radj.clear()
+        self._invalidate()
         
         for node_data in data["nodes"]:
             self.add_type(DataType(name=node_data["name"], schema_def=node_data["schema"]))
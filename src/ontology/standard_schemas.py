@@ -0,0 +1,67 @@
+from typing import Any, Dict
+from utils import json_codec
+
+# Schemas of the built-in data types used by the simulations, defined once.
+# Treat them as read-only: the graph stores references to these dicts.
+STANDARD_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    # Server Logs (JSON)
+    "ServerLogs": {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {
+                "timestamp": {"type": "string"},
+                "level": {"type": "string"},
+                "service": {"type": "string"},
+                "message": {"type": "string"}
+            }
+        }
+    },
+    # Consultant Profile (HTML)
+    "ConsultantProfile": {
+        "type": "string",
+        "format": "html",
+        "description": "HTML page containing consultant profile with name, role, contact info, etc."
+    },
+    # Vendor List (JSON)
+    "VendorList": {
+        "type": "object",
+        "properties": {
+            "vendors": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "vendor_id": {"type": "string"},
+                        "name": {"type": "string"}
+                    }
+                }
+            }
+        }
+    },
+    # PDF Invoice (File)
+    "PDFInvoice": {
+        "type": "file",
+        "format": "pdf",
+        "description": "PDF document representing an invoice or receipt"
+    },
+    # Knowledge Graph Triples (The Goal)
+    "KGTriples": {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {
+                "subject": {"type": "string"},
+                "predicate": {"type": "string"},
+                "object": {"type": "string"}
+            }
+        }
+    },
+}
+
+# Canonical (sorted-key) JSON of each schema, encoded once. Embedding these in
+# prompts keeps them byte-identical across runs.
+SCHEMA_JSON: Dict[str, str] = {
+    name: json_codec.dumps(schema, sort_keys=True).decode("utf-8")
+    for name, schema in STANDARD_SCHEMAS.items()
+}
@@ -1,10 +1,22 @@
-from typing import List
-from pydantic import BaseModel
+from typing import Any, Dict, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, PrivateAttr
 
 class Tool(BaseModel):
     """Represents a Capability (Edge)"""
+    # Frozen, with only immutable field values (constraints is a tuple), so the
+    # cached dump below can't go stale
+    model_config = ConfigDict(frozen=True)
+
     name: str
     input_type: str
     output_type: str
-    constraints: List[str] = []
+    constraints: Tuple[str, ...] = ()
     code: str = "" # The actual implementation
+
+    _cached_dump: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+
+    def dump_cached(self) -> Dict[str, Any]:
+        """Returns model_dump(), computed once per tool (as a fresh shallow copy)."""
+        if self._cached_dump is None:
+            self._cached_dump = self.model_dump()
+        return dict(self._cached_dump)
@@ -1,5 +1,8 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, List, Optional
+from utils import json_codec
+from utils.code_parsing import extract_code_block
 
 class LLMProvider(ABC):
     """Abstract base class for LLM providers."""
@@ -18,3 +21,41 @@ class LLMProvider(ABC):
             The generated text.
         """
         pass
+
+    def generate_json(self, prompt: str, schema: Dict[str, Any], name: str = "output", system_prompt: Optional[str] = None, **kwargs) -> Any:
+        """
+        Generates a value matching the JSON schema and returns it parsed.
+        Providers with native structured output should override this; the default
+        asks for JSON in the prompt and parses the reply.
+        """
+        prompt = f"{prompt}\n\nRespond ONLY with JSON matching this schema ({name}):\n{json_codec.dumps(schema, sort_keys=True).decode('utf-8')}"
+        response = self.generate(prompt, system_prompt, **kwargs)
+        return json_codec.loads(extract_code_block(response, language="json"))
+
+    def generate_stream(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Iterator[str]:
+        """
+        Yields the response text in chunks as it is generated. Providers that support
+        streaming should override this; the default yields the full response once.
+        Closing the iterator early abandons the rest of the response.
+        """
+        yield self.generate(prompt, system_prompt, **kwargs)
+
+    async def agenerate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
+        """
+        Async variant of `generate`. Providers with a native async client should
+        override this; the default runs `generate` in a worker thread.
+        """
+        return await asyncio.to_thread(self.generate, prompt, system_prompt, **kwargs)
+
+    async def generate_batch(self, prompts: List[str], system_prompt: Optional[str] = None, concurrency: int = 32, **kwargs) -> List[str]:
+        """
+        Generates a response for every prompt concurrently, with at most
+        `concurrency` requests in flight. Results keep the order of `prompts`.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(prompt: str) -> str:
+            async with semaphore:
+                return await self.agenerate(prompt, system_prompt=system_prompt, **kwargs)
+
+        return await asyncio.gather(*(one(prompt) for prompt in prompts))
@@ -1,14 +1,22 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional
 from .base import LLMProvider
 
 class OllamaProvider(LLMProvider):
     """Concrete implementation for Ollama (local models)."""
 
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama3"):
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama3", timeout: float = 300.0):
         self.base_url = base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         self.model = model or os.getenv("OLLAMA_MODEL", "llama3")
+        self.timeout = timeout
+        
+        # Reuse keep-alive connections across generate() calls
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
 
     def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
         url = f"{self.base_url}/api/generate"
@@ -28,7 +36,7 @@ class OllamaProvider(LLMProvider):
             payload["system"] = system_prompt
 
         try:
-            response = requests.post(url, json=payload)
+            response = self._session.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             return response.json().get("response", "")
         except requests.RequestException as e:
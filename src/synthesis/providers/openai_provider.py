@@ -1,36 +1,226 @@
+import importlib.util
 import os
-from typing import Optional
-from openai import OpenAI
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
 from .base import LLMProvider
+from ..cache import ResponseCache
+from utils import json_codec
 from utils.tracer import tracer
 
+try:
+    import httpx
+except ImportError:
+    # Newer openai releases are built on httpx2, which keeps the same config API
+    import httpx2 as httpx
+
+# Connection pool sized for generate_batch fan-out rather than the SDK's defaults,
+# with long-lived keep-alive connections. HTTP/2 lets concurrent requests share a
+# connection but needs the optional h2 package, so it's only enabled when present.
+_HTTP_LIMITS = httpx.Limits(max_connections=256, max_keepalive_connections=128, keepalive_expiry=60.0)
+_HTTP_TIMEOUT = httpx.Timeout(connect=5.0, read=120.0, write=30.0, pool=5.0)
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Batch statuses after which polling stops
+_BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+@lru_cache(maxsize=32)
+def _system_message(system_prompt: str) -> Dict[str, str]:
+    # Shared between requests: the same system prompt is sent with every call of a
+    # batch or retry loop, so build its message dict once. Must not be mutated.
+    return {"role": "system", "content": system_prompt}
+
+def _strict_json_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Adapts a JSON schema to OpenAI's strict structured-output rules: every object
+    lists all its properties as required and forbids additional ones.
+    """
+    schema = dict(schema)
+    if schema.get("type") == "object":
+        properties = {k: _strict_json_schema(v) for k, v in schema.get("properties", {}).items()}
+        schema["properties"] = properties
+        schema["required"] = list(properties)
+        schema["additionalProperties"] = False
+    if "items" in schema:
+        schema["items"] = _strict_json_schema(schema["items"])
+    return schema
+
 class OpenAIProvider(LLMProvider):
     """Concrete implementation for OpenAI API."""
 
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, cache_path: Optional[str] = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY env var or pass it in.")
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = OpenAI(
+            api_key=self.api_key,
+            http_client=DefaultHttpxClient(http2=_HTTP2, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+        )
+        # Used by agenerate/generate_batch. The SDK retries rate limits and timeouts
+        # with exponential backoff and jitter; allow more attempts for batch fan-out.
+        self.aclient = AsyncOpenAI(
+            api_key=self.api_key,
+            max_retries=5,
+            http_client=DefaultAsyncHttpxClient(http2=_HTTP2, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+        )
         self.model = model or os.getenv("OPENAI_MODEL", "gpt-4o")
+        
+        # Optional exact-match response cache (only used for temperature=0 calls)
+        cache_path = cache_path or os.getenv("LLM_CACHE_PATH")
+        self.cache = ResponseCache(cache_path) if cache_path else None
+
+    def _build_messages(self, prompt: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+        user_message = {"role": "user", "content": prompt}
+        if system_prompt:
+            return [_system_message(system_prompt), user_message]
+        return [user_message]
 
     def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
+        # Only deterministic requests are worth replaying from the cache
+        if self.cache is None or kwargs.get("temperature", 1.0) != 0:
+            return self._generate(prompt, system_prompt, **kwargs)
+        return self._cached_call(prompt, system_prompt, **kwargs)
+
+    def _cached_call(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
+        key = ResponseCache.make_key(self.model, system_prompt, prompt, kwargs)
+        content = self.cache.get(key)
+        if content is not None:
+            tracer.log_event("llm_cache_hit", {"provider": "openai", "model": self.model, "prompt_length": len(prompt)})
+            return content
+        content = self._generate(prompt, system_prompt, **kwargs)
+        self.cache.set(key, content)
+        return content
+
+    def _generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
         tracer.start_span("llm_generate", {"provider": "openai", "model": self.model, "prompt_length": len(prompt)})
         
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+        messages = self._build_messages(prompt, system_prompt)
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                **kwargs
-            )
+            response = self.client.chat.completions.create(model=self.model, messages=messages, **kwargs)
             content = response.choices[0].message.content
             tracer.end_span(outputs={"response_length": len(content)})
             return content
         except Exception as e:
             tracer.end_span(error=str(e))
             raise e
+
+    def generate_json(self, prompt: str, schema: Dict[str, Any], name: str = "output", system_prompt: Optional[str] = None, **kwargs) -> Any:
+        # Structured outputs need an object at the root, so other schemas are wrapped
+        # in {"value": ...} and unwrapped again after parsing.
+        wrapped = schema.get("type") != "object"
+        root = {"type": "object", "properties": {"value": schema}} if wrapped else schema
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {"name": name, "schema": _strict_json_schema(root), "strict": True}
+        }
+        content = self._generate(prompt, system_prompt, response_format=response_format, **kwargs)
+        result = json_codec.loads(content)
+        return result["value"] if wrapped else result
+
+    def generate_stream(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Iterator[str]:
+        # The caller may stop consuming at any point, so log a single event once the
+        # stream is done instead of holding a span open across yields.
+        messages = self._build_messages(prompt, system_prompt)
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **kwargs
+        )
+        response_length = 0
+        completed = False
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    response_length += len(content)
+                    yield content
+            completed = True
+        finally:
+            # Closes the HTTP response, so an early exit stops the download
+            stream.close()
+            tracer.log_event("llm_generate_stream", {
+                "provider": "openai",
+                "model": self.model,
+                "prompt_length": len(prompt),
+                "response_length": response_length,
+                "completed": completed
+            })
+
+    async def agenerate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
+        # Concurrent calls would interleave on the tracer's span stack, so log a
+        # single event per request instead of a span.
+        messages = self._build_messages(prompt, system_prompt)
+
+        response = await self.aclient.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            **kwargs
+        )
+        content = response.choices[0].message.content
+        tracer.log_event("llm_agenerate", {"provider": "openai", "model": self.model, "prompt_length": len(prompt), "response_length": len(content)})
+        return content
+
+    def generate_batch_offline(
+        self,
+        prompts: List[str],
+        system_prompt: Optional[str] = None,
+        poll_interval: float = 10.0,
+        max_poll_interval: float = 300.0,
+        **kwargs
+    ) -> List[Optional[str]]:
+        """
+        Runs the prompts through the OpenAI Batch API, which is billed at a discount
+        but only guarantees completion within 24h. Blocks until the batch finishes.
+        
+        Returns:
+            One response per prompt, in order; None for requests that failed.
+        """
+        tracer.start_span("llm_generate_batch_offline", {"provider": "openai", "model": self.model, "num_prompts": len(prompts)})
+
+        requests_jsonl = b"\n".join(
+            json_codec.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": self.model, "messages": self._build_messages(prompt, system_prompt), **kwargs}
+            })
+            for i, prompt in enumerate(prompts)
+        )
+
+        try:
+            input_file = self.client.files.create(file=("batch_requests.jsonl", requests_jsonl), purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            delay = poll_interval
+            while batch.status not in _BATCH_TERMINAL_STATUSES:
+                time.sleep(delay)
+                delay = min(delay * 2, max_poll_interval)
+                batch = self.client.batches.retrieve(batch.id)
+
+            if batch.status != "completed":
+                raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+
+            results: List[Optional[str]] = [None] * len(prompts)
+            if batch.output_file_id:
+                output = self.client.files.content(batch.output_file_id).content
+                for line in output.splitlines():
+                    if not line.strip():
+                        continue
+                    record = json_codec.loads(line)
+                    response = record.get("response") or {}
+                    if response.get("status_code") == 200:
+                        results[int(record["custom_id"])] = response["body"]["choices"][0]["message"]["content"]
+        except Exception as e:
+            tracer.end_span(error=str(e))
+            raise e
+
+        tracer.end_span(outputs={"completed": sum(r is not None for r in results)})
+        return results
@@ -1,26 +1,66 @@
-import json
+from functools import lru_cache
+from string import Template
 from typing import Any, Dict
+from utils import json_codec
 
-class TestGenerator:
-    """
-    Generates pytest code to validate data against a schema.
-    """
-    
-    def generate_test_code(self, target_type: str, schema: Dict[str, Any]) -> str:
-        """
-        Generates a python string containing pytest functions.
-        """
-        schema_json = json.dumps(schema)
-        
-        code = f"""
+# Loads result.json once per pytest session and hands it to every test as a fixture.
+# $json is orjson alongside fastjsonschema, and the stdlib json module otherwise.
+CONFTEST_TEMPLATE = Template("""
+import pathlib
+import $json
+import pytest
+
+@pytest.fixture(scope="session")
+def result():
+    # Strategy: The runner saves the result to 'result.json', and the tests read it.
+    path = pathlib.Path("result.json")
+    if not path.exists():
+        pytest.fail("result.json not found")
+    return $json.loads(path.read_bytes())
+""")
+
+# The schema is shipped next to the test module as schema.json rather than being
+# inlined, so the module only depends on the target type and can be rendered once.
+TEST_TEMPLATE = Template("""
+import pathlib
+import $json
 import pytest
-import json
-import sys
 
 # Target Schema
-SCHEMA = {schema_json}
+SCHEMA = $json.loads(pathlib.Path("schema.json").read_bytes())
 
-def validate_schema(data, schema):
+$validator
+def test_output_schema(result):
+    validate(result)
+$type_tests""")
+
+# Specific checks for Knowledge Graph. Each is a single all() over the triples, so
+# the iteration runs in C rather than as a Python loop of asserts.
+KG_TRIPLES_TESTS = """
+TRIPLE_KEYS = {"subject", "predicate", "object"}
+
+def test_kg_not_empty(result):
+    assert len(result) > 0, "Knowledge Graph should not be empty"
+
+def test_all_triples_dicts(result):
+    assert all(type(t) is dict for t in result), "Every triple must be a dictionary"
+
+def test_all_triples_have_keys(result):
+    assert all(TRIPLE_KEYS <= t.keys() for t in result), "Every triple needs subject, predicate and object"
+
+def test_all_values_str(result):
+    assert all(
+        type(t["subject"]) is str and type(t["predicate"]) is str and type(t["object"]) is str
+        for t in result
+    ), "Triple subjects, predicates and objects must be strings"
+"""
+
+# Extra tests emitted for specific target types
+TYPE_TESTS = {"KGTriples": KG_TRIPLES_TESTS}
+
+# Dependency-free (stdlib only) recursive check that only looks at types. Also used
+# by the fastjsonschema validator for schemas it can't compile.
+TYPE_CHECK = """def validate_schema(data, schema):
     if schema.get("type") == "array":
         assert isinstance(data, list), "Output must be a list"
         if "items" in schema:
@@ -32,35 +72,77 @@ def validate_schema(data, schema):
             for prop, prop_schema in schema["properties"].items():
                 if prop in data:
                     validate_schema(data[prop], prop_schema)
-                # Note: We are not strictly enforcing required fields here for simplicity, 
+                # Note: We are not strictly enforcing required fields here for simplicity,
                 # but we could if 'required' list exists.
-                
+
     elif schema.get("type") == "string":
         assert isinstance(data, str), "Output must be a string"
     elif schema.get("type") == "integer":
         assert isinstance(data, int), "Output must be an integer"
     # Add more types as needed
+"""
+
+RECURSIVE_VALIDATOR = TYPE_CHECK + """
+def validate(data):
+    validate_schema(data, SCHEMA)
+"""
+
+# fastjsonschema generates and compiles a validator specialised for SCHEMA once, at import.
+# The repo's custom types (e.g. PDFInvoice's {"type": "file"}) are not JSON Schema and
+# fail to compile; those schemas get the type check instead.
+FASTJSONSCHEMA_VALIDATOR = TYPE_CHECK + """
+import fastjsonschema
+
+try:
+    _validate = fastjsonschema.compile(SCHEMA)
+except fastjsonschema.JsonSchemaDefinitionException:
+    _validate = None
 
-def test_output_schema():
-    # This function will be called by the runner with the actual result
-    # But wait, pytest usually runs on files.
-    # We need a way to pass the result to the test.
-    # Strategy: The runner saves the result to 'result.json', and the test reads it.
-    
+def validate(data):
+    if _validate is None:
+        validate_schema(data, SCHEMA)
+        return
     try:
-        with open("result.json", "r") as f:
-            result = json.load(f)
-    except FileNotFoundError:
-        pytest.fail("result.json not found")
-        
-    validate_schema(result, SCHEMA)
-    
-    # Specific checks for Knowledge Graph
-    if "{target_type}" == "KGTriples":
-        assert len(result) > 0, "Knowledge Graph should not be empty"
-        for triple in result:
-            assert "subject" in triple
-            assert "predicate" in triple
-            assert "object" in triple
+        _validate(data)
+    except fastjsonschema.JsonSchemaException as e:
+        pytest.fail(f"Output does not match schema: {e.message}")
 """
-        return code
+
+def _json_module(use_fastjsonschema: bool) -> str:
+    return "orjson" if use_fastjsonschema else "json"
+
+@lru_cache(maxsize=2)
+def _render_conftest(use_fastjsonschema: bool) -> str:
+    return CONFTEST_TEMPLATE.substitute(json=_json_module(use_fastjsonschema))
+
+@lru_cache(maxsize=64)
+def _render_test_module(target_type: str, use_fastjsonschema: bool) -> str:
+    validator = FASTJSONSCHEMA_VALIDATOR if use_fastjsonschema else RECURSIVE_VALIDATOR
+    return TEST_TEMPLATE.substitute(
+        json=_json_module(use_fastjsonschema),
+        validator=validator,
+        type_tests=TYPE_TESTS.get(target_type, ""),
+    )
+
+class TestGenerator:
+    """
+    Generates pytest code to validate data against a schema.
+    By default the tests validate with fastjsonschema (full JSON Schema support)
+    and parse JSON with orjson; with use_fastjsonschema=False they only need the
+    standard library (json plus a type check).
+    """
+
+    def __init__(self, use_fastjsonschema: bool = True):
+        self.use_fastjsonschema = use_fastjsonschema
+
+    def generate_test_files(self, target_type: str, schema: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Generates the files of a pytest suite, keyed by file name: the test module,
+        the conftest.py providing the `result` fixture, and the schema.json it
+        validates against.
+        """
+        return {
+            "conftest.py": _render_conftest(self.use_fastjsonschema),
+            "test_generated.py": _render_test_module(target_type, self.use_fastjsonschema),
+            "schema.json": json_codec.dumps(schema, sort_keys=True).decode("utf-8"),
+        }
@@ -1,19 +1,95 @@
 import re
+from functools import lru_cache
+from typing import List, Optional
+
+# Compiled once at import; the language-specific pattern is cached per language.
+_ANY_BLOCK_RE = re.compile(r"```\s*(.*?)\s*```", re.DOTALL)
+
+@lru_cache(maxsize=16)
+def _language_block_re(language: str) -> "re.Pattern[str]":
+    return re.compile(rf"```{language}\s*(.*?)\s*```", re.DOTALL | re.IGNORECASE)
 
 def extract_code_block(text: str, language: str = "python") -> str:
     """
     Extracts the content of a markdown code block for a specific language.
     If no code block is found, returns the original text (fallback).
     """
-    pattern = rf"```{language}\s*(.*?)\s*```"
-    match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
+    # Linear scan with str.find for the common case: the first fence opens a block
+    # tagged with the requested language. Anything else goes through the regexes.
+    start = text.find("```")
+    if start < 0:
+        return text.strip()
+    body = start + 3 + len(language)
+    if text[start + 3:body].lower() == language.lower() and (body == len(text) or text[body] in " \t\r\n`"):
+        end = text.find("```", body)
+        if end >= 0:
+            return text[body:end].strip()
+
+    match = _language_block_re(language).search(text)
     if match:
         return match.group(1).strip()
-    
+
     # Fallback: try finding any code block
-    pattern_any = r"```\s*(.*?)\s*```"
-    match_any = re.search(pattern_any, text, re.DOTALL)
+    match_any = _ANY_BLOCK_RE.search(text)
     if match_any:
         return match_any.group(1).strip()
-        
+
     return text.strip()
+
+def extract_code_blocks_many(texts: List[str], language: str = "python") -> List[str]:
+    """Applies extract_code_block to each text, e.g. for a batch of LLM responses."""
+    return [extract_code_block(text, language) for text in texts]
+
+class CodeBlockExtractor:
+    """
+    Incremental version of extract_code_block for streamed responses. Text is fed
+    in chunks; feed() returns the code as soon as the closing fence of a block in
+    the requested language arrives, so the caller can stop reading the stream.
+    Like extract_code_block, the block is the first "```<language>" occurrence
+    (a tag that only starts with the language, e.g. "python3", also counts).
+    """
+
+    def __init__(self, language: str = "python"):
+        self.language = language
+        self.code: Optional[str] = None
+        self._text = ""
+        self._pos = 0        # where to look for the next opening fence
+        self._body = None    # start of the matched block's body
+        self._end_pos = 0    # where to look for its closing fence
+
+    def feed(self, chunk: str) -> Optional[str]:
+        if self.code is not None:
+            return self.code
+        self._text += chunk
+        text = self._text
+        tag = self.language.lower()
+
+        while self._body is None:
+            start = text.find("```", self._pos)
+            if start < 0:
+                # A fence may be split across chunks; keep the last two characters in range
+                self._pos = max(self._pos, len(text) - 2)
+                return None
+            body = start + 3 + len(tag)
+            if body > len(text):
+                # Not enough text yet to read the language tag
+                self._pos = start
+                return None
+            if text[start + 3:body].lower() == tag:
+                self._body = self._end_pos = body
+                break
+            # Same as the regex search: try the next position, fences included
+            self._pos = start + 1
+
+        end = text.find("```", self._end_pos)
+        if end < 0:
+            self._end_pos = max(self._end_pos, len(text) - 2)
+            return None
+        self.code = text[self._body:end].strip()
+        return self.code
+
+    def finish(self) -> str:
+        """Returns the extracted code once the stream has ended, with extract_code_block's fallbacks."""
+        if self.code is not None:
+            return self.code
+        return extract_code_block(self._text, self.language)
@@ -0,0 +1,24 @@
+import json
+from typing import Any, Union
+
+# orjson is noticeably faster on both ends; fall back to the stdlib if it isn't installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """Serializes obj to UTF-8 encoded JSON bytes (compact, or indented by 2 spaces)."""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS turns int/float/bool/None keys into strings, like the stdlib does
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=sort_keys).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys).encode("utf-8")
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Deserializes JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,23 @@
+import json
+from functools import lru_cache
+from typing import Any, Callable, Dict
+
+import fastjsonschema
+
+@lru_cache(maxsize=64)
+def _schema_validator(schema_json: str) -> Callable[[Any], Any]:
+    """Compiled validator for a schema, keyed by its canonical JSON."""
+    return fastjsonschema.compile(json.loads(schema_json))
+
+def validate_direct_result(result: Any, schema: Dict[str, Any], type_name: str) -> Any:
+    """
+    Checks a value the LLM produced directly ("direct_json" mode) against the target
+    schema and returns it. Providers don't all enforce the schema (the prompt-only
+    fallback never does), so callers must not trust it unchecked.
+    Raises ValueError if the value does not match.
+    """
+    try:
+        _schema_validator(json.dumps(schema, sort_keys=True))(result)
+    except fastjsonschema.JsonSchemaException as e:
+        raise ValueError(f"Direct JSON result does not match the {type_name} schema: {e.message}")
+    return result
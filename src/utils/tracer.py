@@ -1,30 +1,131 @@
+import atexit
+import itertools
 import json
+import queue
+import threading
 import time
 import os
 import uuid
-from typing import Any, Dict, Optional, List
-from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, List
+from datetime import datetime, timezone
+from utils import json_codec
+
+TRACE_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "logs", "traces.jsonl")
+
+def _format_trace_file(path: str) -> Iterator[Dict[str, Any]]:
+    cached_sec, cached_prefix = None, ""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json_codec.loads(line)
+            ts_ns = entry.get("ts_ns")
+            if ts_ns is not None:
+                sec, frac = divmod(ts_ns, 1_000_000_000)
+                if sec != cached_sec:
+                    cached_sec = sec
+                    cached_prefix = datetime.fromtimestamp(sec, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+                entry["timestamp"] = f"{cached_prefix}.{frac // 1000:06d}"
+            yield entry
 
 class Tracer:
     _instance = None
+    enabled = True
+
+    # Callers only enqueue events; a single writer thread owns the file and does all
+    # the encoding and writing, in batches of up to MAX_BATCH events.
+    MAX_BATCH = 256
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Tracer, cls).__new__(cls)
-            cls._instance.trace_file = os.path.join(os.path.dirname(__file__), "..", "..", "logs", "traces.jsonl")
+            cls._instance.trace_file = TRACE_FILE
             # Ensure data directory exists
             os.makedirs(os.path.dirname(cls._instance.trace_file), exist_ok=True)
-            cls._instance.current_trace_id = str(uuid.uuid4())
+            cls._instance.current_trace_id = uuid.uuid4().hex
+            # Span IDs only need to be unique within a trace: pid plus a counter is
+            # far cheaper than a random UUID. Trace IDs stay random (uuid4).
+            cls._instance._pid = os.getpid()
+            cls._instance._counter = itertools.count()
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=cls._instance._reset_pid)
             cls._instance.span_stack: List[Dict[str, Any]] = []
+            cls._instance._q = queue.SimpleQueue()
+            cls._instance._writer = threading.Thread(target=cls._instance._writer_loop, name="tracer-writer", daemon=True)
+            cls._instance._writer.start()
+            atexit.register(cls._instance._close)
         return cls._instance
 
+    def _reset_pid(self):
+        self._pid = os.getpid()
+
+    @staticmethod
+    def _encode(entry: Dict[str, Any]) -> bytes:
+        try:
+            return json_codec.dumps(entry) + b"\n"
+        except TypeError:
+            # orjson is stricter than the stdlib (e.g. sets, subclassed types); anything
+            # still not serializable is written as its str() rather than killing the writer.
+            return json.dumps(entry, default=str).encode("utf-8") + b"\n"
+
+    @classmethod
+    def _encode_or_placeholder(cls, entry: Dict[str, Any]) -> bytes:
+        # Anything else (tuple keys, circular references, a dict mutated mid-encode)
+        # is replaced by a placeholder, so one bad event can't stop the writer thread.
+        try:
+            return cls._encode(entry)
+        except Exception:
+            try:
+                text = repr(entry)
+            except Exception as e:
+                text = f"<unrepresentable event: {e!r}>"
+            return cls._encode({"ts_ns": entry.get("ts_ns"), "unserializable": text})
+
+    def _writer_loop(self):
+        # Queue items are event dicts, threading.Events to set once everything queued
+        # before them is written (flush), or None to stop.
+        with open(self.trace_file, "ab", buffering=1 << 20) as fh:
+            while True:
+                batch = [self._q.get()]
+                while len(batch) < self.MAX_BATCH:
+                    try:
+                        batch.append(self._q.get_nowait())
+                    except queue.Empty:
+                        break
+
+                lines, waiters, stop = [], [], False
+                for item in batch:
+                    if item is None:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        lines.append(self._encode_or_placeholder(item))
+                if lines:
+                    fh.write(b"".join(lines))
+                    fh.flush()
+                for waiter in waiters:
+                    waiter.set()
+                if stop:
+                    return
+
+    def flush(self, timeout: float = 5.0):
+        """Blocks until all events logged so far have been written to the trace file."""
+        done = threading.Event()
+        self._q.put(done)
+        done.wait(timeout)
+
+    def _close(self):
+        self._q.put(None)
+        self._writer.join(timeout=5.0)
+
     def start_trace(self, trace_id: Optional[str] = None):
-        self.current_trace_id = trace_id or str(uuid.uuid4())
+        self.current_trace_id = trace_id or uuid.uuid4().hex
         self.span_stack = []
         self.log_event("trace_start", {"trace_id": self.current_trace_id})
 
     def start_span(self, name: str, inputs: Optional[Dict[str, Any]] = None) -> str:
-        span_id = str(uuid.uuid4())
+        span_id = f"{self._pid}.{next(self._counter)}"
         span = {
             "span_id": span_id,
             "name": name,
@@ -58,13 +159,51 @@ class Tracer:
         })
 
     def log_event(self, event_type: str, data: Dict[str, Any]):
+        # Integer nanoseconds are much cheaper to produce and encode than an ISO string;
+        # use format_traces() for human-readable timestamps. Encoding happens on the
+        # writer thread, so don't mutate objects after logging them.
         entry = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "ts_ns": time.time_ns(),
             "event": event_type,
             **data
         }
-        with open(self.trace_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry) + "\n")
+        self._q.put_nowait(entry)
+
+    def format_traces(self, path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streams the trace file, adding an ISO 8601 (UTC) "timestamp" to each event.
+        The datetime formatting is done once per whole second and reused.
+        """
+        self.flush()
+        return _format_trace_file(path or self.trace_file)
+
+class _NullTracer:
+    """
+    Stand-in used when tracing is disabled (ONTOGENESIS_TRACE=0): every call is a
+    no-op, so no IDs, timestamps or serialization are paid for.
+    """
+    enabled = False
+    trace_file = TRACE_FILE
+    current_trace_id = None
+
+    def start_trace(self, trace_id: Optional[str] = None):
+        pass
+
+    def start_span(self, name: str, inputs: Optional[Dict[str, Any]] = None) -> str:
+        return ""
+
+    def end_span(self, outputs: Optional[Any] = None, error: Optional[str] = None):
+        pass
+
+    def log_event(self, event_type: str, data: Dict[str, Any]):
+        pass
+
+    def flush(self, timeout: float = 5.0):
+        pass
+
+    def format_traces(self, path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        # Still useful for reading traces written by earlier, traced runs
+        return _format_trace_file(path or self.trace_file)
 
 # Global accessor
-tracer = Tracer()
+tracer = Tracer() if os.getenv("ONTOGENESIS_TRACE", "1") != "0" else _NullTracer()
@@ -1,17 +1,53 @@
 import sys
 import os
 import json
+import pathlib
 from dotenv import load_dotenv
 
 # Add src to python path
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
 from src.ontology.graph import CapabilityGraph
+from src.ontology.standard_schemas import SCHEMA_JSON, STANDARD_SCHEMAS
 from src.ontology.types import DataType
 from src.synthesis.factory import LLMFactory
-from src.utils.code_parsing import extract_code_block
+from src.utils.code_parsing import CodeBlockExtractor
+from src.utils.schema_validation import validate_direct_result
 from src.utils.tracer import tracer
 
+SYSTEM_PROMPT = """You are an expert Python developer.
+Write a Python function `transform(input_data: str) -> List[Dict[str, str]]` that converts the input type into the target type.
+The input is the raw HTML string.
+The output must be a list of dictionaries, each with 'subject', 'predicate', 'object' keys.
+Use BeautifulSoup to parse the HTML with the 'lxml' parser, falling back to 'html.parser' if lxml is not installed.
+Parse the input once and collect all fields in as few passes over the document as possible (avoid a separate `find_all(True)` scan per field).
+Use the following predicates: 'hasName', 'hasRole', 'hasEmail', 'hasPhone'.
+Ensure the output strictly adheres to the target schema.
+Return ONLY the python code, wrapped in a markdown code block.
+"""
+
+SAMPLE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "consultant_profile_mark.html")
+
+DIRECT_JSON_SYSTEM_PROMPT = """You extract a consultant's profile from an HTML page as Knowledge Graph triples.
+Use the following predicates: 'hasName', 'hasRole', 'hasEmail', 'hasPhone'.
+"""
+
+def _report_result(result):
+    print("\n[10] Execution Result (Knowledge Graph Triples):")
+    print("-" * 40)
+    print(json.dumps(result, indent=2))
+    print("-" * 40)
+    
+    # Basic Verification
+    print("\n[11] Verifying Result...")
+    expected_name = "Markus Weber"
+    found_name = any(t['object'] == expected_name for t in result if t['predicate'] == 'hasName')
+    
+    if found_name:
+        print(f"    [PASS] Found expected name: {expected_name}")
+    else:
+        print(f"    [FAIL] Did not find name: {expected_name}")
+
 def main():
     load_dotenv()
     tracer.start_trace()
@@ -22,73 +58,9 @@ def main():
     print("[1] Initialized Capability Graph.")
 
     # 2. Define Types based on data/ directory
-    # Type 1: Server Logs (JSON)
-    server_logs_schema = {
-        "type": "array",
-        "items": {
-            "type": "object",
-            "properties": {
-                "timestamp": {"type": "string"},
-                "level": {"type": "string"},
-                "service": {"type": "string"},
-                "message": {"type": "string"}
-            }
-        }
-    }
-    graph.add_type(DataType(name="ServerLogs", schema_def=server_logs_schema))
-    print("    - Added Type: ServerLogs")
-
-    # Type 2: Consultant Profile (HTML)
-    consultant_profile_schema = {
-        "type": "string",
-        "format": "html",
-        "description": "HTML page containing consultant profile with name, role, contact info, etc."
-    }
-    graph.add_type(DataType(name="ConsultantProfile", schema_def=consultant_profile_schema))
-    print("    - Added Type: ConsultantProfile")
-
-    # Type 3: Vendor List (JSON)
-    vendor_list_schema = {
-        "type": "object",
-        "properties": {
-            "vendors": {
-                "type": "array",
-                "items": {
-                    "type": "object",
-                    "properties": {
-                        "vendor_id": {"type": "string"},
-                        "name": {"type": "string"}
-                    }
-                }
-            }
-        }
-    }
-    graph.add_type(DataType(name="VendorList", schema_def=vendor_list_schema))
-    print("    - Added Type: VendorList")
-
-    # Type 4: PDF Invoice (File)
-    pdf_invoice_schema = {
-        "type": "file",
-        "format": "pdf",
-        "description": "PDF document representing an invoice or receipt"
-    }
-    graph.add_type(DataType(name="PDFInvoice", schema_def=pdf_invoice_schema))
-    print("    - Added Type: PDFInvoice")
-
-    # Type 5: Knowledge Graph Triples (The Goal)
-    kg_triples_schema = {
-        "type": "array",
-        "items": {
-            "type": "object",
-            "properties": {
-                "subject": {"type": "string"},
-                "predicate": {"type": "string"},
-                "object": {"type": "string"}
-            }
-        }
-    }
-    graph.add_type(DataType(name="KGTriples", schema_def=kg_triples_schema))
-    print("    - Added Type: KGTriples (Goal)")
+    for name, schema in STANDARD_SCHEMAS.items():
+        graph.add_type(DataType(name=name, schema_def=schema))
+        print(f"    - Added Type: {name}")
 
     print("\n[2] Defined Ontology Types.")
     
@@ -112,26 +84,41 @@ def main():
         print("\n[!] GAP DETECTED!")
         print(f"    Missing Edge: {gap_result['source']} -> {gap_result['target']}")
         
+        # Load sample data (read once, before any LLM call or retry)
+        input_data = pathlib.Path(SAMPLE_FILE).read_text(encoding="utf-8")
+        
+        # KGTriples is plain JSON, so in "direct_json" mode the LLM produces the triples
+        # themselves through structured output, without synthesizing and running code.
+        # Like the agent, fall back to code synthesis if that fails or doesn't match the schema.
+        if os.getenv("ONTOGENESIS_SYNTHESIS_MODE", "code_synthesis") == "direct_json":
+            print("\n[4] Calling LLM (OpenAI, structured output)...")
+            try:
+                provider = LLMFactory.create_provider("openai")
+                result = provider.generate_json(
+                    f"INPUT:\n{input_data}",
+                    STANDARD_SCHEMAS[target_type],
+                    name=target_type,
+                    system_prompt=DIRECT_JSON_SYSTEM_PROMPT
+                )
+                _report_result(validate_direct_result(result, STANDARD_SCHEMAS[target_type], target_type))
+                return
+            except Exception as e:
+                print(f"\n[ERROR] Direct generation failed: {e}. Falling back to code synthesis...")
+        
         # 4. Generate Prompt
         print("\n[4] Generating Synthesis Prompt...")
         
+        # Static instructions go in the system prompt so the provider can cache that prefix;
+        # the user message only carries the task-specific schemas.
         prompt = f"""
-You are an expert Python developer.
 We have a data type '{start_type}' with schema:
-{json.dumps(graph.graph.nodes[start_type]['schema'], indent=2)}
+{SCHEMA_JSON[start_type]}
 
 We need to transform it into '{target_type}' with schema:
-{json.dumps(graph.graph.nodes[target_type]['schema'], indent=2)}
-
-Write a Python function `transform(input_data: str) -> List[Dict[str, str]]` that performs this conversion.
-The input is the raw HTML string.
-The output must be a list of dictionaries, each with 'subject', 'predicate', 'object' keys.
-Use BeautifulSoup to parse the HTML.
-Use the following predicates: 'hasName', 'hasRole', 'hasEmail', 'hasPhone'.
-Ensure the output strictly adheres to the target schema.
-Return ONLY the python code, wrapped in a markdown code block.
+{SCHEMA_JSON[target_type]}
 """
         print("-" * 40)
+        print(SYSTEM_PROMPT)
         print(prompt)
         print("-" * 40)
         
@@ -139,10 +126,16 @@ Return ONLY the python code, wrapped in a markdown code block.
         print("\n[5] Calling LLM (OpenAI)...")
         try:
             provider = LLMFactory.create_provider("openai")
-            response = provider.generate(prompt)
+            # Stream the response and stop reading as soon as the code block closes
+            extractor = CodeBlockExtractor()
+            stream = provider.generate_stream(prompt, system_prompt=SYSTEM_PROMPT)
+            for chunk in stream:
+                if extractor.feed(chunk) is not None:
+                    stream.close()
+                    break
             
             print("\n[6] Received Response from LLM.")
-            code = extract_code_block(response)
+            code = extractor.finish()
             
             print("\n[7] Extracted Code:")
             print("-" * 40)
@@ -157,35 +150,24 @@ Return ONLY the python code, wrapped in a markdown code block.
 
             # 6. Execute Code
             print("\n[9] Executing Generated Code...")
-            from src.execution.runner import CodeRunner
+            from src.execution.runner import CodeRunner, WarmRunner
             
-            # Load sample data
-            sample_file = os.path.join(os.path.dirname(__file__), "..", "data", "consultant_profile_mark.html")
-            with open(sample_file, "r", encoding="utf-8") as f:
-                input_data = f.read()
-            
-            runner = CodeRunner()
+            # Single-shot run: in-process by default; "warm" uses a persistent worker process
+            if os.getenv("ONTOGENESIS_EXECUTION_MODE", "local") == "warm":
+                runner = WarmRunner()
+            else:
+                runner = CodeRunner()
             try:
                 # We assume the entry point is 'transform' as requested in the prompt
                 result = runner.run_code(code, "transform", input_data=input_data)
                 
-                print("\n[10] Execution Result (Knowledge Graph Triples):")
-                print("-" * 40)
-                print(json.dumps(result, indent=2))
-                print("-" * 40)
-                
-                # Basic Verification
-                print("\n[11] Verifying Result...")
-                expected_name = "Markus Weber"
-                found_name = any(t['object'] == expected_name for t in result if t['predicate'] == 'hasName')
-                
-                if found_name:
-                    print(f"    [PASS] Found expected name: {expected_name}")
-                else:
-                    print(f"    [FAIL] Did not find name: {expected_name}")
+                _report_result(result)
                     
             except Exception as e:
                 print(f"\n[ERROR] Execution failed: {e}")
+            finally:
+                if isinstance(runner, WarmRunner):
+                    runner.close()
                 
         except Exception as e:
             print(f"\n[ERROR] LLM Generation failed: {e}")
@@ -1,14 +1,18 @@
 import sys
 import os
 import json
+import pathlib
 from dotenv import load_dotenv
 
 # Add src to python path
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
 from src.agent.core import OntoGenesisAgent
+from src.ontology.standard_schemas import STANDARD_SCHEMAS
 from src.utils.tracer import tracer
 
+SAMPLE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "consultant_profile_mark.html")
+
 def main():
     load_dotenv()
     tracer.start_trace()
@@ -19,39 +23,17 @@ def main():
     print("[1] Initialized OntoGenesisAgent (Docker Mode).")
 
     # 2. Register Types
-    # Type 1: Consultant Profile (HTML)
-    consultant_profile_schema = {
-        "type": "string",
-        "format": "html",
-        "description": "HTML page containing consultant profile with name, role, contact info, etc."
-    }
-    agent.register_type("ConsultantProfile", consultant_profile_schema)
-    print("    - Registered Type: ConsultantProfile")
-
-    # Type 2: Knowledge Graph Triples (The Goal)
-    kg_triples_schema = {
-        "type": "array",
-        "items": {
-            "type": "object",
-            "properties": {
-                "subject": {"type": "string"},
-                "predicate": {"type": "string"},
-                "object": {"type": "string"}
-            }
-        }
-    }
-    agent.register_type("KGTriples", kg_triples_schema)
-    print("    - Registered Type: KGTriples")
+    for name in ("ConsultantProfile", "KGTriples"):
+        agent.register_type(name, STANDARD_SCHEMAS[name])
+        print(f"    - Registered Type: {name}")
     
     # Visualize initial state
     print("    - Visualizing Ontology Graph...")
     agent.graph.visualize("logs/ontology_v1_initial.png")
 
     # 3. Load Input Data
-    sample_file = os.path.join(os.path.dirname(__file__), "..", "data", "consultant_profile_mark.html")
-    with open(sample_file, "r", encoding="utf-8") as f:
-        input_data = f.read()
-    print(f"\n[2] Loaded input data from {sample_file}")
+    input_data = pathlib.Path(SAMPLE_FILE).read_text(encoding="utf-8")
+    print(f"\n[2] Loaded input data from {SAMPLE_FILE}")
 
     # 4. Solve Task
     print("\n[3] Agent solving task: ConsultantProfile -> KGTriples")
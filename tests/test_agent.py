@@ -7,6 +7,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
 
 from agent.core import OntoGenesisAgent
 from ontology.tools import Tool
+from utils.schema_validation import validate_direct_result
 
 @patch("agent.core.LLMFactory")
 @patch("agent.core.CodeRunner")
@@ -35,6 +36,48 @@ def test_agent_solve_task_synthesis(mock_runner_class, mock_factory):
     mock_llm.generate.assert_called_once()
     mock_runner.run_code.assert_called_once()
 
+@patch("agent.core.LLMFactory")
+@patch("agent.core.CodeRunner")
+def test_agent_solve_task_direct_json(mock_runner_class, mock_factory):
+    mock_llm = MagicMock()
+    mock_factory.create_provider.return_value = mock_llm
+    mock_llm.generate_json.return_value = [{"subject": "a", "predicate": "hasName", "object": "b"}]
+
+    agent = OntoGenesisAgent(synthesis_mode="direct_json")
+    agent.register_type("TypeA", {"type": "string"})
+    agent.register_type("TypeB", {"type": "array", "items": {"type": "object", "properties": {"subject": {"type": "string"}}}})
+    agent.register_type("TypeC", {"type": "file", "format": "pdf"})
+
+    # JSON targets are generated directly, without synthesizing or running code
+    assert agent.solve_task("TypeA", "TypeB", "input") == [{"subject": "a", "predicate": "hasName", "object": "b"}]
+    mock_llm.generate.assert_not_called()
+    mock_runner_class.return_value.run_code.assert_not_called()
+
+    # Non-JSON targets still go through code synthesis
+    mock_llm.generate.return_value = "```python\ndef transform(data):\n    return 'pdf'\n```"
+    mock_runner_class.return_value.run_code.return_value = "pdf"
+    assert agent.solve_task("TypeA", "TypeC", "input") == "pdf"
+    mock_llm.generate_json.assert_called_once()
+
+@patch("agent.core.LLMFactory")
+@patch("agent.core.CodeRunner")
+def test_agent_direct_json_rejects_nonconforming_result(mock_runner_class, mock_factory):
+    mock_llm = MagicMock()
+    mock_factory.create_provider.return_value = mock_llm
+    # "object" is a number instead of a string
+    mock_llm.generate_json.return_value = [{"subject": "a", "predicate": "hasName", "object": 1}]
+    mock_llm.generate.return_value = "```python\ndef transform(data):\n    return []\n```"
+    mock_runner_class.return_value.run_code.return_value = []
+
+    agent = OntoGenesisAgent(synthesis_mode="direct_json")
+    agent.register_type("TypeA", {"type": "string"})
+    agent.register_type("TypeB", {"type": "array", "items": {"type": "object", "properties": {"object": {"type": "string"}}}})
+
+    # The invalid direct result is discarded and code synthesis takes over
+    assert agent.solve_task("TypeA", "TypeB", "input") == []
+    mock_llm.generate_json.assert_called_once()
+    mock_llm.generate.assert_called_once()
+
 @patch("agent.core.LLMFactory")
 def test_agent_solve_task_no_gap(mock_factory):
     # Setup Mocks
@@ -53,3 +96,10 @@ def test_agent_solve_task_no_gap(mock_factory):
     # Currently raises NotImplementedError as per implementation
     with pytest.raises(NotImplementedError):
         agent.solve_task("TypeA", "TypeB", "input")
+
+def test_validate_direct_result():
+    schema = {"type": "array", "items": {"type": "object", "properties": {"subject": {"type": "string"}}}}
+    result = [{"subject": "Ana"}]
+    assert validate_direct_result(result, schema, "KGTriples") is result
+    with pytest.raises(ValueError, match="does not match the KGTriples schema"):
+        validate_direct_result([{"subject": 3}], schema, "KGTriples")
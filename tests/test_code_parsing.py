@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.code_parsing import CodeBlockExtractor, extract_code_block, extract_code_blocks_many
+
+def test_extract_code_block_variants():
+    assert extract_code_block("no fences here \n") == "no fences here"
+    assert extract_code_block("Here:\n```python\ndef f():\n    return 1\n```\nDone.") == "def f():\n    return 1"
+    assert extract_code_block("```PYTHON\nx = 1\n```") == "x = 1"
+    # The language-tagged block wins over an earlier block of another language
+    assert extract_code_block("```json\n{}\n```\n```python\nx = 1\n```") == "x = 1"
+    # Untagged block falls back to the first block
+    assert extract_code_block("```\nx = 1\n```") == "x = 1"
+    # A tag that merely starts with the language name is not the fast path
+    assert extract_code_block("```python3\nx = 1\n```") == "3\nx = 1"
+    # Unterminated fence returns the text as-is
+    assert extract_code_block("```python\nx = 1") == "```python\nx = 1"
+
+def test_extract_code_blocks_many():
+    texts = ["```python\na = 1\n```", "b = 2", "```\nc = 3\n```"]
+    assert extract_code_blocks_many(texts) == ["a = 1", "b = 2", "c = 3"]
+
+def test_code_block_extractor_streamed():
+    text = "Sure:\n```json\n{}\n```\n```python\ndef f():\n    return 1\n```\nTrailing explanation."
+    extractor = CodeBlockExtractor()
+    results = [extractor.feed(ch) for ch in text]
+
+    # Completes exactly when the closing fence of the python block arrives
+    done_at = next(i for i, r in enumerate(results) if r is not None)
+    assert text[:done_at + 1].endswith("return 1\n```")
+    assert extractor.finish() == "def f():\n    return 1"
+
+def test_code_block_extractor_fallbacks():
+    for text in ["plain code", "```\nx = 1\n```", "```python\nx = 1"]:
+        extractor = CodeBlockExtractor()
+        for i in range(0, len(text), 3):
+            extractor.feed(text[i:i + 3])
+        assert extractor.finish() == extract_code_block(text)
+
+def test_code_block_extractor_matches_extract_code_block():
+    texts = [
+        "```python3\nx = 1\n```\n```python\ny = 2\n```",
+        "```json\n{}\n```python\nx = 1\n```",
+        "````python\nx = 1\n```",
+        "Intro\n```Python\nx = 1\n```",
+    ]
+    for text in texts:
+        for size in (1, 2, 5, len(text)):
+            extractor = CodeBlockExtractor()
+            for i in range(0, len(text), size):
+                extractor.feed(text[i:i + size])
+            assert extractor.finish() == extract_code_block(text), (text, size)
@@ -1,5 +1,6 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import sys
 import os
 
@@ -38,7 +39,113 @@ def test_openai_generate(mock_openai_class):
     assert result == "Generated Code"
     mock_client.chat.completions.create.assert_called_once()
 
-@patch("synthesis.providers.ollama_provider.requests.post")
+    # The system message is built once and reused across calls
+    provider.generate("first", system_prompt="system")
+    provider.generate("second", system_prompt="system")
+    first, second = [c.kwargs["messages"] for c in mock_client.chat.completions.create.call_args_list[1:]]
+    assert first[0] is second[0]
+    assert first[0] == {"role": "system", "content": "system"}
+    assert second[1] == {"role": "user", "content": "second"}
+
+@patch("synthesis.providers.openai_provider.OpenAI")
+def test_openai_generate_stream(mock_openai_class):
+    mock_client = MagicMock()
+    mock_openai_class.return_value = mock_client
+    chunks = []
+    for content in ["```python\n", "x = 1", "\n```", None]:
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = content
+        chunks.append(chunk)
+    mock_stream = MagicMock()
+    mock_stream.__iter__.return_value = iter(chunks)
+    mock_client.chat.completions.create.return_value = mock_stream
+
+    provider = OpenAIProvider(api_key="test")
+    stream = provider.generate_stream("prompt")
+
+    assert next(stream) == "```python\n"
+    stream.close()
+    # Stopping early closes the underlying HTTP stream
+    mock_stream.close.assert_called_once()
+    assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+
+@patch("synthesis.providers.openai_provider.OpenAI")
+def test_openai_generate_json(mock_openai_class):
+    mock_client = MagicMock()
+    mock_openai_class.return_value = mock_client
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = '{"value": [{"subject": "a", "predicate": "hasName", "object": "b"}]}'
+    mock_client.chat.completions.create.return_value = mock_response
+    schema = {
+        "type": "array",
+        "items": {"type": "object", "properties": {"subject": {"type": "string"}, "predicate": {"type": "string"}, "object": {"type": "string"}}}
+    }
+
+    provider = OpenAIProvider(api_key="test")
+    result = provider.generate_json("prompt", schema, name="KGTriples")
+
+    # Array roots are wrapped in an object for structured outputs and unwrapped again
+    assert result == [{"subject": "a", "predicate": "hasName", "object": "b"}]
+    json_schema = mock_client.chat.completions.create.call_args.kwargs["response_format"]["json_schema"]
+    assert json_schema["name"] == "KGTriples" and json_schema["strict"] is True
+    item_schema = json_schema["schema"]["properties"]["value"]["items"]
+    assert item_schema["required"] == ["subject", "predicate", "object"]
+    assert item_schema["additionalProperties"] is False
+
+@patch("synthesis.providers.openai_provider.OpenAI")
+def test_openai_response_cache(mock_openai_class, tmp_path):
+    mock_client = MagicMock()
+    mock_openai_class.return_value = mock_client
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "Cached Code"
+    mock_client.chat.completions.create.return_value = mock_response
+
+    provider = OpenAIProvider(api_key="test", cache_path=str(tmp_path / "cache.sqlite"))
+
+    # Deterministic requests are served from the cache on replay
+    assert provider.generate("prompt", temperature=0) == "Cached Code"
+    assert provider.generate("prompt", temperature=0) == "Cached Code"
+    assert mock_client.chat.completions.create.call_count == 1
+
+    # Sampled requests always hit the API
+    provider.generate("prompt")
+    assert mock_client.chat.completions.create.call_count == 2
+
+@patch("synthesis.providers.openai_provider.AsyncOpenAI")
+def test_openai_generate_batch(mock_async_openai_class):
+    mock_client = MagicMock()
+    mock_async_openai_class.return_value = mock_client
+
+    async def create(model, messages, **kwargs):
+        response = MagicMock()
+        response.choices[0].message.content = f"echo: {messages[-1]['content']}"
+        return response
+    mock_client.chat.completions.create = AsyncMock(side_effect=create)
+
+    provider = OpenAIProvider(api_key="test")
+    results = asyncio.run(provider.generate_batch(["a", "b", "c"], concurrency=2))
+
+    assert results == ["echo: a", "echo: b", "echo: c"]
+    assert mock_client.chat.completions.create.await_count == 3
+
+@patch("synthesis.providers.openai_provider.OpenAI")
+def test_openai_generate_batch_offline(mock_openai_class):
+    mock_client = MagicMock()
+    mock_openai_class.return_value = mock_client
+    mock_client.batches.create.return_value = MagicMock(id="batch_1", status="completed", output_file_id="file_out")
+    mock_client.files.content.return_value.content = (
+        b'{"custom_id": "1", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "second"}}]}}}\n'
+        b'{"custom_id": "0", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "first"}}]}}}\n'
+    )
+
+    provider = OpenAIProvider(api_key="test")
+    results = provider.generate_batch_offline(["p0", "p1", "p2"])
+
+    assert results == ["first", "second", None]
+    mock_client.files.create.assert_called_once()
+    assert mock_client.files.create.call_args.kwargs["purpose"] == "batch"
+
+@patch("synthesis.providers.ollama_provider.requests.Session.post")
 def test_ollama_generate(mock_post):
     # Setup mock
     mock_response = MagicMock()
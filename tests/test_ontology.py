@@ -36,3 +36,50 @@ def test_gap_detection():
     
     gap = graph.detect_gap("PDF", "Text")
     assert gap["gap"] is False
+
+def test_find_path_multi_hop():
+    graph = CapabilityGraph()
+    for name in ["PDF", "Text", "Triples"]:
+        graph.add_type(DataType(name=name, schema_def={}))
+
+    graph.add_tool(Tool(name="pdf_to_text", input_type="PDF", output_type="Text"))
+    assert graph.find_path("PDF", "Triples") == []
+
+    # Adding a tool invalidates the memoized (empty) path
+    graph.add_tool(Tool(name="text_to_triples", input_type="Text", output_type="Triples"))
+    assert graph.find_path("PDF", "Triples") == ["PDF", "Text", "Triples"]
+    assert graph.find_path("Triples", "PDF") == []
+    assert graph.find_path("PDF", "PDF") == ["PDF"]
+
+def test_gap_detection_reports_search_sets():
+    graph = CapabilityGraph()
+    for name in ["PDF", "Text", "Summary", "Triples"]:
+        graph.add_type(DataType(name=name, schema_def={}))
+    graph.add_tool(Tool(name="pdf_to_text", input_type="PDF", output_type="Text"))
+    graph.add_tool(Tool(name="summary_to_triples", input_type="Summary", output_type="Triples"))
+
+    gap = graph.detect_gap("PDF", "Triples")
+    assert gap["gap"] is True
+    assert set(gap["forward_reachable"]) == {"PDF", "Text"}
+    assert set(gap["backward_required"]) == {"Summary", "Triples"}
+
+    # Bridging the middle closes the gap
+    graph.add_tool(Tool(name="text_to_summary", input_type="Text", output_type="Summary"))
+    assert graph.detect_gap("PDF", "Triples")["gap"] is False
+
+def test_gap_detection_with_cycle():
+    # Cyclic graphs fall back to the bidirectional search
+    graph = CapabilityGraph()
+    for name in ["A", "B", "C"]:
+        graph.add_type(DataType(name=name, schema_def={}))
+    graph.add_tool(Tool(name="a_to_b", input_type="A", output_type="B"))
+    graph.add_tool(Tool(name="b_to_a", input_type="B", output_type="A"))
+
+    gap = graph.detect_gap("A", "C")
+    assert gap["gap"] is True
+    assert set(gap["forward_reachable"]) == {"A", "B"}
+    assert set(gap["backward_required"]) == {"C"}
+
+    graph.add_tool(Tool(name="b_to_c", input_type="B", output_type="C"))
+    assert graph.detect_gap("A", "C")["gap"] is False
+    assert graph.find_path("A", "C") == ["A", "B", "C"]
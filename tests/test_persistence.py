@@ -38,3 +38,23 @@ def test_save_load_graph(tmp_path):
     assert loaded_tool.name == "tool_a_to_b"
     assert loaded_tool.input_type == "TypeA"
     assert loaded_tool.output_type == "TypeB"
+
+def test_tool_constraints_round_trip_and_cached_dump(tmp_path):
+    tool = Tool(name="tool_a_to_b", input_type="TypeA", output_type="TypeB", constraints=["no_empty"])
+    assert tool.constraints == ("no_empty",)
+
+    # The cached dump is handed out as a copy, so callers can't corrupt it
+    tool.dump_cached()["name"] = "changed"
+    assert tool.dump_cached()["name"] == "tool_a_to_b"
+
+    graph = CapabilityGraph()
+    graph.add_type(DataType(name="TypeA", schema_def={"type": "string"}))
+    graph.add_type(DataType(name="TypeB", schema_def={"type": "integer"}))
+    graph.add_tool(tool)
+    save_path = tmp_path / "graph.json"
+    graph.save_to_json(str(save_path))
+
+    new_graph = CapabilityGraph()
+    new_graph.load_from_json(str(save_path))
+    loaded_tool = new_graph.graph.get_edge_data("TypeA", "TypeB")["tool"]
+    assert loaded_tool.constraints == ("no_empty",)
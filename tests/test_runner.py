@@ -1,10 +1,15 @@
+import io
 import pytest
 import sys
 import os
+import tarfile
+from unittest.mock import MagicMock, patch
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
 
-from execution.runner import CodeRunner
+from execution.runner import CodeRunner, WarmRunner, _compile
+from execution.process_runner import ProcessRunner
+from execution.docker_runner import CONTAINER_MAX_LIFETIME, DockerRunner, RUNNER_LABEL, TOOL_USER
 
 def test_run_simple_function():
     runner = CodeRunner()
@@ -42,3 +47,287 @@ def crash():
 """
     with pytest.raises(RuntimeError, match="Failed to execute entry point"):
         runner.run_code(code, "crash")
+
+def test_repeated_code_is_compiled_once():
+    runner = CodeRunner()
+    code = """
+def double(x):
+    return x * 2
+"""
+    _compile.cache_clear()
+    assert runner.run_code(code, "double", x=2) == 4
+    assert runner.run_code(code, "double", x=5) == 10
+    assert _compile.cache_info().misses == 1
+
+def test_repeated_code_reuses_warm_scope():
+    runner = CodeRunner()
+    code = """
+LOADS = []
+LOADS.append(1)
+def loads():
+    return len(LOADS)
+"""
+    assert runner.run_code(code, "loads") == 1
+    # The module body is not re-executed for the same code
+    assert runner.run_code(code, "loads") == 1
+    # A different runner starts from a fresh scope
+    assert CodeRunner().run_code(code, "loads") == 1
+
+def test_warm_scopes_are_bounded_lru():
+    runner = CodeRunner(max_scopes=2)
+    codes = [f"def f():\n    return {i}\n" for i in range(3)]
+    runner.run_code(codes[0], "f")
+    runner.run_code(codes[1], "f")
+    # Touch the first scope so the second becomes least recently used
+    runner.run_code(codes[0], "f")
+    runner.run_code(codes[2], "f")
+    assert len(runner._scopes) == 2
+    assert len(runner._funcs) == 2
+    assert [runner.run_code(c, "f") for c in codes] == [0, 1, 2]
+    assert len(runner._scopes) == 2
+
+def test_result_is_returned_without_serialization():
+    # The in-process runner hands back the entry point's return value as-is;
+    # only DockerRunner needs to marshal results through JSON.
+    runner = CodeRunner()
+    code = """
+SENTINEL = object()
+def make():
+    return [{"subject": "a", "predicate": "b", "object": SENTINEL}]
+"""
+    result = runner.run_code(code, "make")
+    assert type(result[0]["object"]) is object
+
+def test_process_runner_simple_function():
+    runner = ProcessRunner()
+    code = """
+import json
+def to_json(data):
+    return json.dumps(data)
+"""
+    result = runner.run_code(code, "to_json", data={"key": "value"})
+    assert result == '{"key": "value"}'
+
+def test_process_runner_forks_only_on_linux(monkeypatch):
+    monkeypatch.setattr(sys, "platform", "darwin")
+    runner = ProcessRunner()
+    assert runner._fork is False
+    # Without fork the worker receives the source instead of the code object
+    assert runner.run_code("def f(x):\n    return x + 1\n", "f", x=1) == 2
+
+def test_process_runner_errors():
+    runner = ProcessRunner()
+    with pytest.raises(ValueError, match="Entry point 'bar' not found"):
+        runner.run_code("def foo():\n    pass\n", "bar")
+    with pytest.raises(RuntimeError, match="Failed to execute entry point"):
+        runner.run_code("def crash():\n    raise ValueError('Boom')\n", "crash")
+
+def test_process_runner_timeout():
+    runner = ProcessRunner(timeout=0.5)
+    code = """
+import time
+def slow():
+    time.sleep(10)
+"""
+    with pytest.raises(RuntimeError, match="timed out"):
+        runner.run_code(code, "slow")
+
+def test_warm_runner_reuses_worker():
+    runner = WarmRunner()
+    try:
+        code = """
+def transform(input_data):
+    print("noise on stdout")
+    return {"length": len(input_data)}
+"""
+        assert runner.run_code(code, "transform", input_data="abc") == {"length": 3}
+        pid = runner._proc.pid
+        assert runner.run_code(code, "transform", input_data="abcd") == {"length": 4}
+        assert runner._proc.pid == pid
+
+        with pytest.raises(ValueError, match="Entry point 'bar' not found"):
+            runner.run_code("def foo():\n    pass\n", "bar")
+        with pytest.raises(RuntimeError, match="Failed to execute entry point"):
+            runner.run_code("def crash():\n    raise ValueError('Boom')\n", "crash")
+    finally:
+        runner.close()
+
+def test_warm_runner_batch_and_recovery():
+    runner = WarmRunner(timeout=0.5)
+    try:
+        results = runner.run_batch(["def f(x):\n    return x * 2\n", "def f(x):\n    raise ValueError('Boom')\n"], "f", x=4)
+        assert results[0] == 8
+        assert isinstance(results[1], RuntimeError)
+
+        # A hung worker is killed and replaced on the next call
+        with pytest.raises(RuntimeError, match="timed out"):
+            runner.run_code("import time\ndef slow():\n    time.sleep(10)\n", "slow")
+        assert runner.run_code("def f():\n    return 1\n", "f") == 1
+    finally:
+        runner.close()
+
+def _untar(archive):
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        return {m.name: (tar.extractfile(m).read() if m.isfile() else None) for m in tar.getmembers()}
+
+@pytest.fixture
+def docker_runner():
+    """DockerRunner on a mocked Docker client: one tool container and one verification container."""
+    with patch("execution.docker_runner.docker.DockerClient") as client_class:
+        client = client_class.return_value
+        client.containers.list.return_value = []
+        tool_container, verify_container = MagicMock(status="running"), MagicMock(status="running")
+        client.containers.run.side_effect = [tool_container, verify_container]
+        runner = DockerRunner(pool_size=1)
+        yield runner, client, tool_container, verify_container
+        runner.close()
+
+def test_docker_run_code(docker_runner):
+    runner, client, container, _ = docker_runner
+    container.exec_run.return_value = (0, (b'[{"subject": "a"}]', b""))
+
+    assert runner.run_code("def transform(x): return x", "transform", input_data={"k": "v"}) == [{"subject": "a"}]
+
+    # Code and input go into a fresh job directory
+    path, archive = container.put_archive.call_args.args
+    files = _untar(archive)
+    job = next(name for name, data in files.items() if data is None)
+    assert path == "/tmp" and job.startswith("job-")
+    assert files[f"{job}/script.py"] == b"def transform(x): return x"
+    assert files[f"{job}/input.json"] in (b'{"k":"v"}', b'{"k": "v"}')
+
+    # The wrapper runs there as the unprivileged user, and the directory is removed afterwards
+    run_call, cleanup_call = container.exec_run.call_args_list
+    assert run_call.args[0] == ["timeout", "-k", "5", "60", "python", "-B", "/app/wrapper.py", "transform"]
+    assert run_call.kwargs["workdir"] == f"/tmp/{job}"
+    assert run_call.kwargs["user"] == TOOL_USER
+    assert cleanup_call.args[0] == ["rm", "-rf", f"/tmp/{job}"]
+
+    # Containers are labelled for reaping
+    assert RUNNER_LABEL in client.containers.run.call_args.kwargs["labels"]
+
+def test_docker_run_code_errors_return_container(docker_runner):
+    runner, _, container, _ = docker_runner
+
+    container.exec_run.return_value = (1, (b"", b"ERROR: Boom"))
+    with pytest.raises(RuntimeError, match="Container execution failed: ERROR: Boom"):
+        runner.run_code("code", "transform")
+
+    container.exec_run.return_value = (0, (b"not json", b""))
+    with pytest.raises(RuntimeError, match="Invalid JSON"):
+        runner.run_code("code", "transform")
+
+    container.put_archive.side_effect = Exception("daemon went away")
+    with pytest.raises(RuntimeError, match="Docker execution failed"):
+        runner.run_code("code", "transform")
+
+    # The container went back into the pool after each failure
+    assert runner._pool.qsize() == 1
+    assert runner._pool.get_nowait() is container
+
+def test_docker_replaces_dead_container(docker_runner):
+    runner, client, container, _ = docker_runner
+    container.status = "exited"
+    replacement = MagicMock(status="running")
+    replacement.exec_run.return_value = (0, (b"1", b""))
+    client.containers.run.side_effect = [replacement]
+
+    assert runner.run_code("code", "transform") == 1
+    container.exec_run.assert_not_called()
+    assert runner._pool.get_nowait() is replacement
+
+def test_docker_input_with_non_str_keys(docker_runner):
+    runner, _, container, _ = docker_runner
+    container.exec_run.return_value = (0, (b'{"1": "a"}', b""))
+
+    # Like the stdlib json module, int keys are written as strings
+    assert runner.run_code("code", "transform", input_data={1: "a"}) == {"1": "a"}
+    files = _untar(container.put_archive.call_args.args[1])
+    assert next(data for name, data in files.items() if name.endswith("input.json")) == b'{"1":"a"}'
+
+def test_docker_timeouts(docker_runner):
+    runner, _, container, _ = docker_runner
+    container.exec_run.return_value = (124, (b"", b""))
+    with pytest.raises(RuntimeError, match="timed out after 60.0s"):
+        runner.run_code("code", "transform")
+    assert runner._pool.get_nowait() is container
+
+    runner.api = MagicMock()
+    runner.api.exec_create.return_value = {"Id": "exec-1"}
+    runner.api.exec_start.return_value = []
+    runner.api.exec_inspect.return_value = {"ExitCode": 124}
+    with pytest.raises(RuntimeError, match="Verification timed out"):
+        runner.verify_result([1], {"test_generated.py": ""})
+
+def test_docker_recycles_old_container(docker_runner):
+    runner, client, container, _ = docker_runner
+    # Started long enough ago that a job could outlive the container's `sleep`
+    runner._started[container.id] -= CONTAINER_MAX_LIFETIME - runner.timeout
+    replacement = MagicMock(status="running")
+    replacement.exec_run.return_value = (0, (b"1", b""))
+    client.containers.run.side_effect = [replacement]
+
+    assert runner.run_code("code", "transform") == 1
+    container.exec_run.assert_not_called()
+    container.remove.assert_called_once_with(force=True)
+    assert runner._pool.get_nowait() is replacement
+
+def test_docker_verify_result(docker_runner):
+    runner, _, tool_container, container = docker_runner
+    runner.api = MagicMock()
+    runner.api.exec_create.return_value = {"Id": "exec-1"}
+    runner.api.exec_start.return_value = [b"1 failed"]
+    runner.api.exec_inspect.return_value = {"ExitCode": 1}
+
+    with pytest.raises(RuntimeError, match="Verification failed: 1 failed"):
+        runner.verify_result([1], {"test_generated.py": "def test_x(): pass", "schema.json": "{}"})
+
+    # Runs in the verification container only, in its own job directory
+    tool_container.put_archive.assert_not_called()
+    files = _untar(container.put_archive.call_args.args[1])
+    job = next(name for name, data in files.items() if data is None)
+    assert set(files) == {job, f"{job}/test_generated.py", f"{job}/schema.json", f"{job}/result.json"}
+    args = runner.api.exec_create.call_args
+    assert args.args[1] == [
+        "timeout", "-k", "5", "60",
+        "pytest", "-p", "no:cacheprovider", "--rootdir", f"/tmp/{job}", f"/tmp/{job}/test_generated.py",
+    ]
+    assert args.kwargs["workdir"] == f"/tmp/{job}"
+    assert runner._verify_pool.get_nowait() is container
+
+    runner._verify_pool.put(container)
+    runner.api.exec_inspect.return_value = {"ExitCode": 0}
+    assert runner.verify_result([1], {"test_generated.py": ""}) is True
+
+@pytest.mark.skipif(os.name != "posix", reason="owner liveness is only checked on POSIX")
+def test_docker_reaps_orphaned_containers():
+    import socket
+    import subprocess
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    host = socket.gethostname()
+    orphan = MagicMock(labels={RUNNER_LABEL: f"{host}:{dead.pid}"})
+    alive = MagicMock(labels={RUNNER_LABEL: f"{host}:{os.getpid()}"})
+
+    with patch("execution.docker_runner.docker.DockerClient") as client_class:
+        client = client_class.return_value
+        client.containers.list.return_value = [orphan, alive]
+        runner = DockerRunner(pool_size=1)
+        orphan.remove.assert_called_once_with(force=True)
+        alive.remove.assert_not_called()
+
+        # close() removes the runner's own containers
+        runner.close()
+        assert client.containers.run.return_value.remove.call_count == 2
+
+def test_warm_runner_timeout_without_select():
+    # On Windows select() fails on pipes; the runner must not depend on it
+    with patch("select.select", side_effect=OSError("not a socket")):
+        runner = WarmRunner(timeout=0.5)
+        try:
+            assert runner.run_code("def f():\n    return 2\n", "f") == 2
+            with pytest.raises(RuntimeError, match="timed out after 0.5s"):
+                runner.run_code("import time\ndef slow():\n    time.sleep(10)\n", "slow")
+            assert runner.run_code("def f():\n    return 3\n", "f") == 3
+        finally:
+            runner.close()
@@ -0,0 +1,76 @@
+import json
+import pytest
+import os
+import subprocess
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from synthesis import test_generator
+
+KG_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"subject": {"type": "string"}, "predicate": {"type": "string"}, "object": {"type": "string"}},
+        "additionalProperties": False
+    }
+}
+
+def _run_suite(tmp_path, files, result):
+    for name, content in files.items():
+        (tmp_path / name).write_text(content)
+    (tmp_path / "result.json").write_text(json.dumps(result))
+    return subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", *[n for n in files if n.startswith("test_")]],
+        cwd=tmp_path, capture_output=True, text=True
+    )
+
+@pytest.mark.parametrize("use_fastjsonschema", [True, False])
+def test_generated_suite_passes_and_fails(tmp_path, use_fastjsonschema):
+    files = test_generator.TestGenerator(use_fastjsonschema).generate_test_files("KGTriples", KG_SCHEMA)
+    assert json.loads(files["schema.json"]) == KG_SCHEMA
+
+    good = [{"subject": "Ana", "predicate": "hasRole", "object": "Engineer"}]
+    assert _run_suite(tmp_path, files, good).returncode == 0
+
+    bad = [{"subject": "Ana", "predicate": "hasRole", "object": 3}]
+    assert _run_suite(tmp_path, files, bad).returncode != 0
+
+def test_fastjsonschema_enforces_full_schema(tmp_path):
+    files = test_generator.TestGenerator().generate_test_files("KGTriples", KG_SCHEMA)
+
+    extra = [{"subject": "Ana", "predicate": "hasRole", "object": "Engineer", "note": "x"}]
+    run = _run_suite(tmp_path, files, extra)
+    assert run.returncode != 0
+    assert "does not match schema" in run.stdout
+
+def test_kg_triples_checks(tmp_path):
+    files = test_generator.TestGenerator(use_fastjsonschema=False).generate_test_files("KGTriples", KG_SCHEMA)
+    assert "test_all_triples_have_keys" in files["test_generated.py"]
+
+    # Not caught by the type-only validator, caught by the KGTriples tests
+    assert _run_suite(tmp_path, files, [{"subject": "Ana", "predicate": "hasRole"}]).returncode != 0
+    assert _run_suite(tmp_path, files, []).returncode != 0
+
+    other = test_generator.TestGenerator().generate_test_files("OtherType", KG_SCHEMA)
+    assert "test_all_triples_have_keys" not in other["test_generated.py"]
+
+def test_type_check_suite_uses_only_stdlib():
+    files = test_generator.TestGenerator(use_fastjsonschema=False).generate_test_files("KGTriples", KG_SCHEMA)
+    for name in ("conftest.py", "test_generated.py"):
+        assert "import json" in files[name]
+        assert "orjson" not in files[name]
+        assert "fastjsonschema" not in files[name]
+
+def test_fastjsonschema_falls_back_for_custom_types(tmp_path):
+    # {"type": "file"} is one of the repo's own types, not JSON Schema
+    schema = {
+        "type": "object",
+        "properties": {"document": {"type": "file", "format": "pdf"}, "title": {"type": "string"}},
+    }
+    files = test_generator.TestGenerator().generate_test_files("PDFInvoice", schema)
+
+    assert _run_suite(tmp_path, files, {"document": "invoice.pdf", "title": "March"}).returncode == 0
+    # The type check still applies to the parts it understands
+    assert _run_suite(tmp_path, files, {"document": "invoice.pdf", "title": 3}).returncode != 0
@@ -0,0 +1,63 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.tracer import tracer
+from utils import json_codec
+
+def test_format_traces(tmp_path):
+    trace_file = tmp_path / "traces.jsonl"
+    events = [
+        {"ts_ns": 1_700_000_000_123_456_789, "event": "span_start"},
+        {"ts_ns": 1_700_000_000_987_654_321, "event": "span_end"},
+        {"ts_ns": 1_700_000_001_000_000_000, "event": "trace_start"},
+    ]
+    trace_file.write_bytes(b"\n".join(json_codec.dumps(e) for e in events) + b"\n")
+
+    formatted = list(tracer.format_traces(str(trace_file)))
+
+    assert [e["timestamp"] for e in formatted] == [
+        "2023-11-14T22:13:20.123456",
+        "2023-11-14T22:13:20.987654",
+        "2023-11-14T22:13:21.000000",
+    ]
+    assert formatted[0]["event"] == "span_start"
+
+@pytest.mark.skipif(not tracer.enabled, reason="tracing disabled via ONTOGENESIS_TRACE=0")
+def test_log_event_is_written_by_writer_thread(tmp_path):
+    tracer.log_event("test_event", {"marker": "writer-thread", "values": {1, 2}})
+    tracer.flush()
+
+    events = [e for e in tracer.format_traces() if e.get("marker") == "writer-thread"]
+    assert events[-1]["event"] == "test_event"
+    # Values the encoder can't handle are written as strings
+    assert events[-1]["values"] == "{1, 2}"
+
+@pytest.mark.skipif(not tracer.enabled, reason="tracing disabled via ONTOGENESIS_TRACE=0")
+def test_span_ids_are_unique_and_compact():
+    first = tracer.start_span("outer")
+    second = tracer.start_span("inner")
+    tracer.end_span()
+    tracer.end_span()
+
+    assert first != second
+    assert first.startswith(f"{os.getpid()}.")
+    assert len(tracer.current_trace_id) == 32
+
+@pytest.mark.skipif(not tracer.enabled, reason="tracing disabled via ONTOGENESIS_TRACE=0")
+def test_unserializable_event_does_not_stop_writer():
+    circular = {}
+    circular["self"] = circular
+    tracer.log_event("test_event", {"marker": "bad-tuple-key", "values": {(1, 2): "x"}})
+    tracer.log_event("test_event", {"marker": "bad-circular", "values": circular})
+    tracer.log_event("test_event", {"marker": "after-bad-events"})
+    tracer.flush()
+
+    events = list(tracer.format_traces())
+    placeholders = [e for e in events if "bad-tuple-key" in e.get("unserializable", "")]
+    assert placeholders and "ts_ns" in placeholders[-1]
+    assert any("bad-circular" in e.get("unserializable", "") for e in events)
+    assert tracer._writer.is_alive()
+    assert any(e.get("marker") == "after-bad-events" for e in events)